@@ -12,24 +12,35 @@ Para iniciar:
 """
 
 import os
-import json
 import time
+import asyncio
+import random
+import hashlib
+import multiprocessing
+from collections import OrderedDict
+from itertools import zip_longest
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple, Any, Union
 
 import torch
 import numpy as np
 from fastapi import FastAPI, File, UploadFile, HTTPException, Query, Form, Body
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import faiss
+import onnxruntime as ort
+import orjson
 from PIL import Image
 from pydantic import BaseModel
 
 # Importar módulos locais
-from src.model import SpeciesClassifier, load_model
+from src.model import SpeciesClassifier, load_model, export_onnx
+from src.search import Int8EmbeddingIndex, quantize_embeddings_int8
+from src.image_preprocessing import preprocess_bytes
 from src.utils import (
-    load_image_from_bytes, preprocess_image, get_top_k_predictions, 
+    load_image_from_file, preprocess_image, decode_image_to_tensor,
+    get_top_k_predictions, 
     format_prediction_result, create_visualization
 )
 
@@ -52,7 +63,8 @@ class SimilarityRequest(BaseModel):
 app = FastAPI(
     title="API de Classificação de Espécies",
     description="API para classificação de imagens de plantas e animais",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configurar CORS
@@ -69,21 +81,76 @@ model = None
 class_to_idx = None
 idx_to_class = None
 device = None
+species_response = None
+
+# Sessão do ONNX Runtime (o modelo PyTorch é mantido como fallback)
+USE_ONNX = os.getenv("USE_ONNX", "1") == "1"
+ort_session = None
+
+# Forward compilado com torch.compile (substitui o ONNX Runtime quando ativo)
+TORCH_COMPILE = os.getenv("TORCH_COMPILE", "0") == "1"
+compiled_forward = None
+
+# Modelo convertido para TorchScript otimizado (substitui os demais backends)
+TORCHSCRIPT = os.getenv("TORCHSCRIPT", "0") == "1"
+
+# Precisão reduzida: FP16 na GPU, int8 na CPU (calibrado com imagens de treino)
+QUANTIZE = os.getenv("QUANTIZE", "0") == "1"
+CALIBRATION_DIR = Path(os.getenv("CALIBRATION_DIR", "data/processed/train"))
+input_dtype = torch.float32
+input_memory_format = torch.contiguous_format
+
+# Micro-batching: requisições concorrentes são agrupadas em um único forward
+MAX_BATCH = int(os.getenv("MAX_BATCH", "16"))
+BATCH_TIMEOUT = float(os.getenv("BATCH_TIMEOUT", "0.005"))
+inference_queue = None
+batch_worker = None
+
+# Thread única que executa todos os forwards (aquecimento e batches): o estado
+# de CUDA graphs do torch.compile e os buffers de staging são por thread
+inference_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+
+# Decodificação de JPEG na GPU com nvJPEG (apenas CUDA)
+GPU_DECODE = os.getenv("GPU_DECODE", "1") == "1"
+
+# Pool de processos para decodificação/pré-processamento na CPU (fora do GIL)
+PREPROCESS_WORKERS = int(os.getenv("PREPROCESS_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))
+preprocess_pool = None
+
+# Buffers de staging para cópias assíncronas CPU -> GPU (apenas CUDA)
+pinned_buffer = None
+device_buffer = None
 
 # Variáveis para busca por similaridade (FAISS)
 embedding_index = None
 image_ids = None
+NPROBE = int(os.getenv("NPROBE", "8"))
+gpu_resources = None
+
+# Cache LRU de embeddings indexado pelo hash do conteúdo da imagem
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+embedding_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+model_version = None
 
 
 @app.on_event("startup")
 async def startup_event():
     """Carrega o modelo e inicializa componentes na inicialização."""
-    global model, class_to_idx, idx_to_class, device, embedding_index, image_ids
+    global model, class_to_idx, idx_to_class, device, embedding_index, image_ids, ort_session, compiled_forward
+    global inference_queue, batch_worker, input_dtype, gpu_resources, model_version
+    global pinned_buffer, device_buffer, input_memory_format, preprocess_pool, species_response
     
     # Determinar dispositivo
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
     print(f"Usando dispositivo: {device}")
     
+    if device.type == "cuda":
+        # Entradas têm forma fixa: o cuDNN escolhe o algoritmo de convolução
+        # mais rápido uma vez; layout NHWC e TF32 habilitam Tensor Cores
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision("high")
+        input_memory_format = torch.channels_last
+    
     # Caminhos
     model_dir = Path("models")
     model_path = model_dir / "species_classifier.pth"
@@ -95,10 +162,104 @@ async def startup_event():
     
     try:
         # Carregar modelo
-        model, class_to_idx = load_model(model_path, device)
-        idx_to_class = {idx: cls for cls, idx in class_to_idx.items()}
+        calibration_images = None
+        if QUANTIZE:
+            if device.type == "cuda":
+                input_dtype = torch.float16
+            else:
+                calibration_images = load_calibration_images(CALIBRATION_DIR)
+        
+        model, class_to_idx = load_model(
+            model_path,
+            device,
+            optimize=TORCHSCRIPT,
+            quantize=QUANTIZE,
+            calibration_images=calibration_images,
+            channels_last=device.type == "cuda"
+        )
+        idx_to_class = model.idx_to_class
         print(f"Modelo carregado com {len(class_to_idx)} classes")
         
+        # Lista de espécies é fixa para o modelo carregado
+        species_list = sorted(name.replace('_', ' ') for name in class_to_idx.keys())
+        species_response = {"species_count": len(species_list), "species": species_list}
+        
+        # Versão do modelo para invalidar o cache de embeddings quando o checkpoint mudar
+        model_stat = model_path.stat()
+        model_version = f"{model_stat.st_mtime_ns}-{model_stat.st_size}"
+        
+        if TORCHSCRIPT:
+            print("Modelo convertido para TorchScript otimizado")
+        
+        elif TORCH_COMPILE:
+            # Compilar um forward com assinatura fixa (logits, embedding)
+            def forward_with_embedding(x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+                return model(x, return_embedding=True)
+            
+            compiled_forward = torch.compile(forward_with_embedding, mode="reduce-overhead", fullgraph=True)
+            print("Modelo compilado com torch.compile")
+        
+        elif USE_ONNX and not QUANTIZE and device.type == "cuda" \
+                and "CUDAExecutionProvider" not in ort.get_available_providers():
+            # O pacote onnxruntime (somente CPU) tiraria a inferência da GPU
+            print("Aviso: ONNX Runtime sem CUDAExecutionProvider (instale onnxruntime-gpu); "
+                  "usando PyTorch na GPU")
+        
+        elif USE_ONNX and not QUANTIZE:
+            # Exportar para ONNX e servir a inferência pelo ONNX Runtime
+            try:
+                onnx_path = model_dir / "species_classifier.onnx"
+                if not onnx_path.exists() or onnx_path.stat().st_mtime < model_path.stat().st_mtime:
+                    export_onnx(model, onnx_path)
+                ort_session = create_onnx_session(onnx_path, device)
+                print(f"Sessão ONNX Runtime criada com {ort_session.get_providers()}")
+            except Exception as e:
+                ort_session = None
+                print(f"Aviso: falha ao preparar ONNX Runtime, usando PyTorch: {str(e)}")
+        
+        # Buffer em memória fixada (pinned) permite cópias não bloqueantes para a GPU
+        if device.type == "cuda":
+            pinned_buffer = torch.empty((MAX_BATCH, 3, 224, 224), pin_memory=True)
+            device_buffer = torch.empty_like(pinned_buffer, device=device, memory_format=input_memory_format)
+        
+        # Processos "spawn" não herdam o estado CUDA/threads do processo da API;
+        # com decodificação na GPU, o pool só atende formatos rejeitados pelo nvJPEG
+        num_preprocess_workers = 1 if GPU_DECODE and device.type == "cuda" else PREPROCESS_WORKERS
+        preprocess_pool = ProcessPoolExecutor(
+            max_workers=num_preprocess_workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        
+        # Iniciar worker de micro-batching
+        inference_queue = asyncio.Queue()
+        batch_worker = asyncio.create_task(batch_inference_worker())
+        
+        # Aquecer o backend antes de aceitar requisições, na thread de inferência;
+        # se o backend otimizado falhar, usar o modelo PyTorch em modo eager
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(inference_executor, warmup_model)
+        except Exception as e:
+            if compiled_forward is None and ort_session is None:
+                model = None
+                raise
+            
+            print(f"Aviso: falha no aquecimento do backend, usando PyTorch em modo eager: {str(e)}")
+            compiled_forward = None
+            ort_session = None
+            try:
+                await loop.run_in_executor(inference_executor, warmup_model)
+            except Exception:
+                model = None
+                raise
+        
+        # Iniciar os processos de pré-processamento agora (são criados sob
+        # demanda), para que a primeira requisição não pague o spawn
+        await asyncio.gather(*(
+            loop.run_in_executor(preprocess_pool, os.getpid)
+            for _ in range(num_preprocess_workers)
+        ))
+        
         # Carregar índice FAISS se existir
         embedding_path = model_dir / "embeddings.index"
         mapping_path = model_dir / "embedding_mapping.json"
@@ -107,16 +268,375 @@ async def startup_event():
             # Carregar índice FAISS
             embedding_index = faiss.read_index(str(embedding_path))
             
-            # Carregar mapeamento de IDs
-            with open(mapping_path, 'r') as f:
-                embedding_mapping = json.load(f)
+            # Número de listas invertidas visitadas por busca (índices IVF)
+            if isinstance(embedding_index, faiss.IndexIVF):
+                embedding_index.nprobe = NPROBE
+            
+            # Carregar mapeamento de IDs (catálogos grandes usam array memory-mapped)
+            with open(mapping_path, 'rb') as f:
+                embedding_mapping = orjson.loads(f.read())
+            
+            if "image_ids_file" in embedding_mapping:
+                image_ids = np.load(model_dir / embedding_mapping["image_ids_file"], mmap_mode='r')
+            else:
                 image_ids = embedding_mapping["image_ids"]
-                
+            
+            # Na GPU, mover o índice com FAISS-GPU ou usar a cópia int8 dos
+            # embeddings; se nenhum dos dois funcionar, mantém o índice na CPU
+            if device.type == "cuda":
+                embedding_index = move_index_to_gpu(embedding_index, model_dir)
+            
             print(f"Índice de embeddings carregado com {embedding_index.ntotal} imagens")
     except Exception as e:
         print(f"Erro ao inicializar modelo: {str(e)}")
 
 
+def move_index_to_gpu(index: faiss.Index, model_dir: Path):
+    """
+    Move o índice de embeddings para a GPU.
+    
+    Tenta o FAISS-GPU e, se ele não estiver instalado ou não suportar o
+    índice (por exemplo, IVF-PQ de produto interno com 64 dimensões por
+    subquantizador), usa a cópia int8 dos embeddings. Sem nenhuma das duas
+    opções, retorna o índice original (busca na CPU).
+    
+    Args:
+        index: Índice FAISS carregado na CPU
+        model_dir: Diretório com embeddings_int8.npy e embedding_scales.npy
+        
+    Returns:
+        Índice a ser usado na busca
+    """
+    global gpu_resources
+    
+    if hasattr(faiss, "StandardGpuResources"):
+        try:
+            gpu_resources = faiss.StandardGpuResources()
+            gpu_index = faiss.index_cpu_to_gpu(gpu_resources, 0, index)
+            print("Índice de embeddings movido para a GPU (FAISS)")
+            return gpu_index
+        except Exception as e:
+            gpu_resources = None
+            print(f"Aviso: FAISS-GPU não suporta o índice: {str(e)}")
+    
+    if (model_dir / "embeddings_int8.npy").exists():
+        try:
+            int8_index = Int8EmbeddingIndex.load(model_dir, device)
+            print("Índice de embeddings int8 carregado na GPU")
+            return int8_index
+        except Exception as e:
+            print(f"Aviso: falha ao carregar embeddings int8 na GPU: {str(e)}")
+    
+    print("Usando índice de embeddings na CPU")
+    return index
+
+
+def load_calibration_images(
+    calibration_dir: Path,
+    num_images: int = 50,
+    seed: int = 42
+) -> Optional[torch.Tensor]:
+    """
+    Carrega imagens de treino para calibrar a quantização int8.
+    
+    Cópias aumentadas (*_aug_*) são ignoradas e as imagens são sorteadas com
+    semente fixa, alternando entre as classes para cobrir todas igualmente.
+    
+    Args:
+        calibration_dir: Diretório com imagens organizadas por classe
+        num_images: Número máximo de imagens a carregar
+        seed: Semente do sorteio das imagens
+        
+    Returns:
+        Batch de imagens pré-processadas ou None se nenhuma for encontrada
+    """
+    rng = random.Random(seed)
+    
+    per_class = []
+    for class_dir in sorted(p for p in calibration_dir.glob("*") if p.is_dir()):
+        paths = sorted(p for p in class_dir.glob("*.jpg") if "_aug_" not in p.stem)
+        rng.shuffle(paths)
+        if paths:
+            per_class.append(paths)
+    
+    # Uma imagem de cada classe por rodada até atingir num_images
+    image_paths = []
+    for round_paths in zip_longest(*per_class):
+        image_paths.extend(path for path in round_paths if path is not None)
+        if len(image_paths) >= num_images:
+            break
+    image_paths = image_paths[:num_images]
+    
+    if not image_paths:
+        print(f"Aviso: nenhuma imagem de calibração em {calibration_dir}; quantizando apenas a camada final")
+        return None
+    
+    return torch.cat([preprocess_image(load_image_from_file(str(path))) for path in image_paths])
+
+
+def create_onnx_session(onnx_path: Path, device: torch.device) -> ort.InferenceSession:
+    """
+    Cria a sessão do ONNX Runtime para o modelo exportado.
+    
+    Args:
+        onnx_path: Caminho do arquivo ONNX
+        device: Dispositivo usado pelo modelo PyTorch
+        
+    Returns:
+        Sessão de inferência do ONNX Runtime
+    """
+    providers = ["CPUExecutionProvider"]
+    if device.type == "cuda" and "CUDAExecutionProvider" in ort.get_available_providers():
+        providers.insert(0, "CUDAExecutionProvider")
+    
+    # Habilitar todas as otimizações de grafo (fusão Conv+BN+ReLU etc.)
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    
+    return ort.InferenceSession(str(onnx_path), sess_options=options, providers=providers)
+
+
+async def load_image_tensor(contents: bytes) -> torch.Tensor:
+    """
+    Decodifica e pré-processa uma imagem enviada.
+    
+    Na GPU, JPEGs são decodificados com nvJPEG e processados no próprio
+    dispositivo, na thread de inferência; outros formatos e arquivos
+    rejeitados pelo nvJPEG seguem pelo caminho com PIL, executado no pool de
+    processos para não disputar o GIL com o event loop.
+    
+    Args:
+        contents: Bytes da imagem enviada
+        
+    Returns:
+        Tensor pré-processado com batch de uma imagem
+    """
+    loop = asyncio.get_running_loop()
+    
+    # A decodificação na GPU roda na thread de inferência, que já detém o
+    # contexto CUDA, para não bloquear o event loop
+    if GPU_DECODE and device.type == "cuda":
+        try:
+            return await loop.run_in_executor(inference_executor, decode_image_to_tensor, contents, device)
+        except RuntimeError:
+            pass
+    
+    img_array = await loop.run_in_executor(preprocess_pool, preprocess_bytes, contents)
+    
+    # Os processos retornam uint8; a conversão para float é feita aqui
+    return torch.from_numpy(img_array).unsqueeze(0).float().div_(255.0)
+
+
+def stage_to_device(img_tensor: torch.Tensor) -> torch.Tensor:
+    """
+    Copia um batch para o dispositivo através do buffer em memória fixada.
+    
+    A cópia a partir de memória pinned é assíncrona em relação à CPU; batches
+    que não cabem no buffer seguem pelo caminho padrão.
+    
+    Args:
+        img_tensor: Batch de imagens na CPU
+        
+    Returns:
+        Batch de imagens no dispositivo do modelo
+    """
+    if (pinned_buffer is None
+            or img_tensor.device.type != "cpu"
+            or img_tensor.shape[0] > pinned_buffer.shape[0]
+            or img_tensor.shape[1:] != pinned_buffer.shape[1:]):
+        return img_tensor.to(device, memory_format=input_memory_format, non_blocking=True)
+    
+    batch_size = img_tensor.shape[0]
+    pinned_buffer[:batch_size].copy_(img_tensor)
+    device_buffer[:batch_size].copy_(pinned_buffer[:batch_size], non_blocking=True)
+    
+    return device_buffer[:batch_size]
+
+
+def run_model(img_tensor: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Executa o modelo sobre um batch de imagens pré-processadas.
+    
+    Usa a sessão do ONNX Runtime quando disponível; caso contrário, o
+    forward compilado ou o modelo PyTorch em modo eager.
+    
+    Args:
+        img_tensor: Tensor de entrada (batch de imagens)
+        
+    Returns:
+        Logits de classificação e embeddings em FP32, na CPU
+    """
+    if ort_session is not None:
+        logits, embedding = ort_session.run(None, {"input": img_tensor.cpu().numpy()})
+        return torch.from_numpy(logits), torch.from_numpy(embedding)
+    
+    with torch.inference_mode():
+        img_tensor = stage_to_device(img_tensor).to(dtype=input_dtype)
+        if compiled_forward is not None:
+            logits, embedding = compiled_forward(img_tensor)
+        else:
+            logits, embedding = model(img_tensor, return_embedding=True)
+        
+        # Copiar para a CPU ainda nesta thread: a espera pela GPU não bloqueia
+        # o event loop e as saídas não dependem de buffers reutilizados
+        return logits.float().cpu(), embedding.float().cpu()
+
+
+def warmup_model(num_passes: int = 3) -> None:
+    """
+    Executa forwards de aquecimento com imagens vazias.
+    
+    As primeiras execuções pagam a compilação (torch.compile), o perfilamento
+    e a especialização do grafo (TorchScript), a criação do contexto CUDA e o
+    autotune do cuDNN; fazê-las na inicialização evita que esse custo caia
+    nas primeiras requisições. Como esses custos se repetem para cada forma
+    de entrada, os backends compilados e a GPU são aquecidos com todos os
+    tamanhos de batch que o worker de micro-batching pode gerar.
+    
+    Deve ser executada em inference_executor, a mesma thread dos batches.
+    
+    Args:
+        num_passes: Número de forwards de aquecimento por tamanho de batch
+    """
+    start_time = time.time()
+    
+    if compiled_forward is not None or TORCHSCRIPT or device.type == "cuda":
+        batch_sizes = range(1, MAX_BATCH + 1)
+    else:
+        batch_sizes = [1]
+    
+    for batch_size in batch_sizes:
+        dummy = torch.zeros(batch_size, 3, 224, 224)
+        for _ in range(num_passes):
+            run_model(dummy)
+    
+    if device.type == "cuda":
+        torch.cuda.synchronize()
+    
+    print(f"Aquecimento concluído em {time.time() - start_time:.2f}s")
+
+
+async def batch_inference_worker():
+    """
+    Agrupa requisições pendentes e executa um único forward por batch.
+    
+    Aguarda a primeira imagem da fila, coleta as demais que chegarem em até
+    BATCH_TIMEOUT segundos (no máximo MAX_BATCH) e devolve a cada requisição
+    sua fatia de logits e embeddings.
+    """
+    loop = asyncio.get_running_loop()
+    
+    while True:
+        items = [await inference_queue.get()]
+        deadline = loop.time() + BATCH_TIMEOUT
+        
+        while len(items) < MAX_BATCH:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                items.append(await asyncio.wait_for(inference_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        
+        tensors, futures = zip(*items)
+        
+        try:
+            # Imagens decodificadas na GPU e na CPU podem chegar no mesmo batch
+            if len({tensor.device for tensor in tensors}) > 1:
+                tensors = [tensor.to(device) for tensor in tensors]
+            
+            # Executar o forward fora do event loop
+            batch = torch.cat(tensors)
+            logits, embedding = await loop.run_in_executor(inference_executor, run_model, batch)
+            
+            for i, fut in enumerate(futures):
+                if not fut.done():
+                    fut.set_result((logits[i:i + 1], embedding[i:i + 1]))
+        except Exception as e:
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(e)
+
+
+async def infer(img_tensor: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Envia uma imagem para a fila de micro-batching e aguarda o resultado.
+    
+    Args:
+        img_tensor: Tensor de entrada com batch de uma imagem
+        
+    Returns:
+        Logits de classificação e embeddings da imagem
+    """
+    fut = asyncio.get_running_loop().create_future()
+    await inference_queue.put((img_tensor, fut))
+    return await fut
+
+
+def lookup_image_ids(indices: np.ndarray) -> List[str]:
+    """
+    Converte posições do índice de embeddings em IDs de imagens.
+    
+    Args:
+        indices: Posições retornadas pela busca
+        
+    Returns:
+        IDs das imagens correspondentes
+    """
+    if isinstance(image_ids, np.ndarray):
+        # Array de bytes memory-mapped: indexação vetorizada e decode só do resultado
+        return [image_id.decode('utf-8') for image_id in image_ids[indices]]
+    
+    return [image_ids[idx] for idx in indices.tolist()]
+
+
+async def get_embedding(contents: bytes) -> np.ndarray:
+    """
+    Retorna o embedding de uma imagem, reutilizando o cache LRU.
+    
+    A chave combina a versão do modelo com o hash BLAKE2b do conteúdo
+    enviado, de modo que reenvios da mesma imagem não executam o modelo.
+    
+    Args:
+        contents: Bytes da imagem enviada
+        
+    Returns:
+        Embedding (1, embedding_size) em float32
+    """
+    key = f"{model_version}:{hashlib.blake2b(contents, digest_size=16).hexdigest()}"
+    
+    cached = embedding_cache.get(key)
+    if cached is not None:
+        embedding_cache.move_to_end(key)
+        return cached
+    
+    # Carregar e pré-processar imagem
+    img_tensor = await load_image_tensor(contents)
+    
+    # Extrair embedding
+    _, embedding = await infer(img_tensor)
+    embedding = embedding.numpy().astype('float32')
+    
+    embedding_cache[key] = embedding
+    if len(embedding_cache) > EMBEDDING_CACHE_SIZE:
+        embedding_cache.popitem(last=False)
+    
+    return embedding
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Encerra o worker de micro-batching e o pool de pré-processamento."""
+    if batch_worker is not None:
+        batch_worker.cancel()
+    
+    if preprocess_pool is not None:
+        preprocess_pool.shutdown(wait=False, cancel_futures=True)
+    
+    inference_executor.shutdown(wait=False, cancel_futures=True)
+
+
 @app.get("/")
 async def root():
     """Verifica se a API está funcionando."""
@@ -129,8 +649,7 @@ async def list_species():
     if not model:
         raise HTTPException(status_code=503, detail="Modelo ainda não carregado")
     
-    species_list = sorted([name.replace('_', ' ') for name in class_to_idx.keys()])
-    return {"species_count": len(species_list), "species": species_list}
+    return species_response
 
 
 @app.post("/predict", response_model=PredictionResponse)
@@ -152,20 +671,15 @@ async def predict_species(
         raise HTTPException(status_code=503, detail="Modelo ainda não carregado")
     
     try:
-        # Carregar imagem
+        # Carregar e pré-processar imagem
         contents = await file.read()
-        image = load_image_from_bytes(contents)
-        
-        # Pré-processar imagem
-        img_tensor = preprocess_image(image)
-        img_tensor = img_tensor.to(device)
+        img_tensor = await load_image_tensor(contents)
         
         # Inferência
-        with torch.no_grad():
-            logits = model(img_tensor)
+        logits, _ = await infer(img_tensor)
         
         # Obter top-k predições
-        predictions = get_top_k_predictions(logits, class_to_idx, k=top_k)
+        predictions = get_top_k_predictions(logits, idx_to_class, k=top_k)[0]
         
         # Formatar resultado
         result = format_prediction_result(predictions)
@@ -179,12 +693,19 @@ async def predict_species(
 @app.post("/embeddings", response_model=Dict[str, Any])
 async def extract_embeddings(
     file: UploadFile = File(...),
+    format: str = Query("json", description="Formato da resposta: json, binary (float16) ou int8")
 ):
     """
     Endpoint para extrair embeddings de uma imagem.
     
+    Nos formatos binary e int8 o embedding é retornado como bytes brutos
+    (application/octet-stream), com tipo e tamanho nos cabeçalhos
+    X-Embedding-Dtype e X-Embedding-Size. No formato int8 o cabeçalho
+    X-Embedding-Scale traz a escala para reconstruir os valores em float.
+    
     Args:
         file: Arquivo de imagem enviado pelo cliente
+        format: Formato da resposta
         
     Returns:
         Embeddings extraídos
@@ -192,21 +713,40 @@ async def extract_embeddings(
     if not model:
         raise HTTPException(status_code=503, detail="Modelo ainda não carregado")
     
+    if format not in ("json", "binary", "int8"):
+        raise HTTPException(status_code=400, detail=f"Formato inválido: {format}")
+    
     try:
         # Carregar imagem
         contents = await file.read()
-        image = load_image_from_bytes(contents)
         
-        # Pré-processar imagem
-        img_tensor = preprocess_image(image)
-        img_tensor = img_tensor.to(device)
+        # Extrair embedding (ou reutilizar do cache)
+        embedding = await get_embedding(contents)
+        
+        if format == "binary":
+            return Response(
+                content=embedding[0].astype(np.float16).tobytes(),
+                media_type="application/octet-stream",
+                headers={
+                    "X-Embedding-Dtype": "float16",
+                    "X-Embedding-Size": str(embedding.shape[1])
+                }
+            )
         
-        # Extrair embedding
-        with torch.no_grad():
-            _, embedding = model(img_tensor, return_embedding=True)
+        if format == "int8":
+            embedding_q, scales = quantize_embeddings_int8(embedding)
+            return Response(
+                content=embedding_q[0].tobytes(),
+                media_type="application/octet-stream",
+                headers={
+                    "X-Embedding-Dtype": "int8",
+                    "X-Embedding-Size": str(embedding.shape[1]),
+                    "X-Embedding-Scale": repr(float(scales[0]))
+                }
+            )
         
         # Converter para lista
-        embedding_list = embedding.cpu().numpy().tolist()[0]
+        embedding_list = embedding.tolist()[0]
         
         return {
             "embedding_size": len(embedding_list),
@@ -232,7 +772,7 @@ async def find_similar_species(
     Returns:
         Imagens mais similares
     """
-    if not model or not embedding_index or not image_ids:
+    if not model or embedding_index is None or image_ids is None:
         raise HTTPException(
             status_code=503, 
             detail="Modelo ou índice de embeddings não carregado"
@@ -241,31 +781,38 @@ async def find_similar_species(
     try:
         # Carregar imagem
         contents = await file.read()
-        image = load_image_from_bytes(contents)
-        
-        # Pré-processar imagem
-        img_tensor = preprocess_image(image)
-        img_tensor = img_tensor.to(device)
         
-        # Extrair embedding
-        with torch.no_grad():
-            _, embedding = model(img_tensor, return_embedding=True)
+        # Extrair embedding (ou reutilizar do cache); copiado pois a
+        # normalização abaixo é feita in-place
+        query_vector = (await get_embedding(contents)).copy()
         
-        # Converter para formato numpy
-        query_vector = embedding.cpu().numpy().astype('float32')
+        # Índices de produto interno guardam embeddings normalizados (cosseno)
+        inner_product = embedding_index.metric_type == faiss.METRIC_INNER_PRODUCT
+        if inner_product:
+            faiss.normalize_L2(query_vector)
         
         # Buscar imagens similares
         distances, indices = embedding_index.search(query_vector, top_k)
         
+        # Descartar posições vazias (-1) e converter scores de forma vetorizada
+        valid = (indices[0] >= 0) & (indices[0] < len(image_ids))
+        result_indices = indices[0][valid]
+        scores = distances[0][valid].astype(np.float64)
+        
+        if inner_product:
+            result_similarities = scores
+            result_distances = 1.0 - scores
+        else:
+            result_distances = scores
+            result_similarities = 1.0 / (1.0 + scores)
+        
         # Obter IDs de imagens correspondentes
-        similar_images = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(image_ids):
-                similar_images.append({
-                    "image_id": image_ids[idx],
-                    "distance": float(distances[0][i]),
-                    "similarity": float(1.0 / (1.0 + distances[0][i]))
-                })
+        similar_images = [
+            {"image_id": image_id, "distance": distance, "similarity": similarity}
+            for image_id, distance, similarity in zip(
+                lookup_image_ids(result_indices), result_distances.tolist(), result_similarities.tolist()
+            )
+        ]
         
         return {
             "similar_count": len(similar_images),
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Script para construir o índice de embeddings usado na busca por similaridade.
+
+Este script:
+1. Carrega o modelo treinado
+2. Extrai embeddings das imagens processadas (sem as versões aumentadas)
+3. Normaliza os embeddings para norma unitária (similaridade de cosseno)
+4. Treina um índice FAISS IVF-PQ (IVF4096,PQ32x8) com produto interno
+5. Salva o índice, o mapeamento de IDs e uma cópia int8 dos embeddings
+   (usada para busca na GPU quando o FAISS não tem suporte a GPU)
+
+Uso:
+    python build_index.py --model_path ../models/species_classifier.pth
+"""
+
+import json
+import argparse
+from pathlib import Path
+from typing import List
+
+import numpy as np
+import torch
+import faiss
+from tqdm import tqdm
+
+from model import load_model
+from utils import load_image_from_file, preprocess_image
+from search import quantize_embeddings_int8
+
+
+# Acima deste número de imagens os IDs são salvos como array NumPy de
+# largura fixa, carregado pela API via memory-map
+MEMMAP_THRESHOLD = 1_000_000
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Construir índice de embeddings para busca por similaridade')
+    parser.add_argument('--data_dir', type=str, default='../data',
+                        help='Diretório contendo os dados processados')
+    parser.add_argument('--model_dir', type=str, default='../models',
+                        help='Diretório para salvar o índice')
+    parser.add_argument('--model_path', type=str, default='../models/species_classifier.pth',
+                        help='Caminho do modelo treinado')
+    parser.add_argument('--batch_size', type=int, default=64,
+                        help='Tamanho do batch para extração de embeddings')
+    parser.add_argument('--nlist', type=int, default=4096,
+                        help='Número de centróides do quantizador grosso (IVF)')
+    parser.add_argument('--pq_m', type=int, default=32,
+                        help='Número de subquantizadores do PQ (bytes por vetor)')
+    return parser.parse_args()
+
+
+def extract_embeddings(
+    model: torch.nn.Module,
+    image_paths: List[Path],
+    batch_size: int,
+    device: torch.device
+) -> np.ndarray:
+    """
+    Extrai embeddings de uma lista de imagens.
+    
+    Args:
+        model: Modelo treinado
+        image_paths: Caminhos das imagens
+        batch_size: Tamanho do batch
+        device: Dispositivo (CPU/GPU)
+    
+    Returns:
+        Matriz (N, embedding_size) de embeddings float32
+    """
+    embeddings = []
+    
+    for start in tqdm(range(0, len(image_paths), batch_size), desc="Extraindo embeddings"):
+        batch_paths = image_paths[start:start + batch_size]
+        batch = torch.cat([preprocess_image(load_image_from_file(str(path))) for path in batch_paths])
+        
+        with torch.no_grad():
+            _, embedding = model(batch.to(device), return_embedding=True)
+        
+        embeddings.append(embedding.cpu().numpy().astype('float32'))
+    
+    return np.concatenate(embeddings)
+
+
+def build_index(embeddings: np.ndarray, nlist: int, pq_m: int) -> faiss.Index:
+    """
+    Treina um índice IVF-PQ de produto interno sobre embeddings normalizados.
+    
+    Para conjuntos pequenos, em que não há pontos suficientes para treinar
+    os centróides do IVF (~39 por centróide) e os codebooks do PQ (256),
+    usa um índice exato (IndexFlatIP).
+    
+    Args:
+        embeddings: Matriz (N, D) de embeddings com norma unitária
+        nlist: Número máximo de centróides do IVF
+        pq_m: Número de subquantizadores do PQ
+    
+    Returns:
+        Índice FAISS populado
+    """
+    num_vectors, dim = embeddings.shape
+    nlist = min(nlist, num_vectors // 39)
+    
+    if nlist < 1 or num_vectors < 256:
+        print(f"Apenas {num_vectors} embeddings; usando índice exato (IndexFlatIP)")
+        index = faiss.IndexFlatIP(dim)
+    else:
+        index_spec = f"IVF{nlist},PQ{pq_m}x8"
+        print(f"Treinando índice {index_spec} com {num_vectors} embeddings")
+        index = faiss.index_factory(dim, index_spec, faiss.METRIC_INNER_PRODUCT)
+        index.train(embeddings)
+    
+    index.add(embeddings)
+    return index
+
+
+def main():
+    """Função principal."""
+    args = parse_args()
+    
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    print(f"Usando dispositivo: {device}")
+    
+    data_dir = Path(args.data_dir)
+    model_dir = Path(args.model_dir)
+    model_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Carregar modelo
+    model, _ = load_model(Path(args.model_path), device)
+    
+    # Imagens processadas, ignorando as versões aumentadas
+    image_paths = [
+        path for path in sorted((data_dir / "processed").glob("*/*/*.jpg"))
+        if "_aug_" not in path.stem
+    ]
+    if not image_paths:
+        print(f"Nenhuma imagem encontrada em {data_dir / 'processed'}")
+        return
+    
+    # Extrair e normalizar embeddings
+    embeddings = extract_embeddings(model, image_paths, args.batch_size, device)
+    faiss.normalize_L2(embeddings)
+    
+    # Construir e salvar índice
+    index = build_index(embeddings, args.nlist, args.pq_m)
+    index_path = model_dir / "embeddings.index"
+    faiss.write_index(index, str(index_path))
+    
+    # Salvar embeddings quantizados em int8
+    embeddings_q, scales = quantize_embeddings_int8(embeddings)
+    np.save(model_dir / "embeddings_int8.npy", embeddings_q)
+    np.save(model_dir / "embedding_scales.npy", scales)
+    
+    # Salvar mapeamento de IDs
+    image_ids = [path.relative_to(data_dir).as_posix() for path in image_paths]
+    mapping_path = model_dir / "embedding_mapping.json"
+    
+    if len(image_ids) > MEMMAP_THRESHOLD:
+        ids_array = np.array([image_id.encode('utf-8') for image_id in image_ids])
+        np.save(model_dir / "image_ids.npy", ids_array)
+        mapping = {"image_ids_file": "image_ids.npy"}
+    else:
+        mapping = {"image_ids": image_ids}
+    
+    with open(mapping_path, 'w') as f:
+        json.dump(mapping, f)
+    
+    print(f"Índice com {index.ntotal} embeddings salvo em {index_path}")
+    print(f"Mapeamento de IDs salvo em {mapping_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,15 +15,19 @@ Uso:
 import os
 import csv
 import json
-import time
 import argparse
+import asyncio
+import httpx
 import requests
 from tqdm import tqdm
 from pathlib import Path
-import concurrent.futures
 from typing import Dict, List, Any, Optional, Tuple
 
 
+# Colunas do arquivo de metadados (labels.csv)
+METADATA_FIELDS = ["filepath", "taxon_id", "scientific_name", "common_name",
+                   "latitude", "longitude", "kingdom", "order", "family"]
+
 def parse_args() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Coletar dados do iNaturalist API')
@@ -70,15 +74,29 @@ def get_taxon_id(taxon_name: str) -> int:
         raise Exception(f"Erro ao buscar ID do táxon: {str(e)}")
 
 
-def fetch_observations(taxon_id: int, count: int, quality_grade: str, page_size: int = 200) -> List[Dict[str, Any]]:
+async def fetch_observations(
+    taxon_id: int,
+    count: int,
+    quality_grade: str,
+    page_size: int = 200,
+    max_concurrency: int = 10,
+    dispatch_interval: float = 0.1
+) -> List[Dict[str, Any]]:
     """
     Busca observações de um táxon específico na API do iNaturalist.
     
+    As páginas são buscadas em paralelo, com no máximo `max_concurrency`
+    requisições simultâneas e disparos espaçados de `dispatch_interval`
+    segundos para respeitar os limites de taxa da API. Após a primeira
+    página vazia, as páginas seguintes não são mais requisitadas.
+    
     Args:
         taxon_id: ID do táxon a ser buscado
         count: Número total de observações a serem coletadas
         quality_grade: Filtro de qualidade das observações
         page_size: Número de resultados por página
+        max_concurrency: Número máximo de requisições simultâneas
+        dispatch_interval: Intervalo entre disparos de requisições (segundos)
         
     Returns:
         Lista de observações
@@ -98,41 +116,61 @@ def fetch_observations(taxon_id: int, count: int, quality_grade: str, page_size:
         "order_by": "quality_grade"
     }
     
-    all_observations = []
-    
     print(f"Buscando {count} observações do táxon ID {taxon_id}...")
     
-    # Buscar observações página por página
-    for page in tqdm(range(1, num_pages + 1), desc="Páginas"):
-        params["page"] = page
-        
-        response = requests.get(url, params=params)
-        
-        # Verificar se a requisição foi bem-sucedida
-        if response.status_code != 200:
-            print(f"Erro ao buscar página {page}: {response.status_code}")
-            continue
+    semaphore = asyncio.Semaphore(max_concurrency)
+    progress = tqdm(total=num_pages, desc="Páginas")
+    
+    # Primeira página vazia encontrada; as seguintes não são mais requisitadas
+    first_empty_page = num_pages + 1
+    
+    async def fetch_page(client: httpx.AsyncClient, page: int) -> List[Dict[str, Any]]:
+        nonlocal first_empty_page
         
-        data = response.json()
-        observations = data["results"]
+        # Espaçar os disparos para respeitar os limites de taxa da API
+        await asyncio.sleep((page - 1) * dispatch_interval)
         
-        if not observations:
-            print(f"Sem mais resultados na página {page}")
-            break
+        try:
+            async with semaphore:
+                if page > first_empty_page:
+                    return []
+                response = await client.get(url, params={**params, "page": page})
             
-        all_observations.extend(observations)
-        
-        # Respeitar limites de taxa da API
-        time.sleep(1)
+            # Verificar se a requisição foi bem-sucedida
+            if response.status_code != 200:
+                print(f"Erro ao buscar página {page}: {response.status_code}")
+                return []
+            
+            observations = response.json()["results"]
+            if not observations and page < first_empty_page:
+                print(f"Sem mais resultados na página {page}")
+                first_empty_page = page
+            
+            return observations
+        except httpx.HTTPError as e:
+            print(f"Erro ao buscar página {page}: {str(e)}")
+            return []
+        finally:
+            progress.update(1)
+    
+    limits = httpx.Limits(max_connections=max_concurrency)
+    async with httpx.AsyncClient(http2=True, limits=limits, timeout=30.0) as client:
+        pages = await asyncio.gather(*(fetch_page(client, page) for page in range(1, num_pages + 1)))
+    
+    progress.close()
+    
+    # Concatenar páginas na ordem original
+    all_observations = [observation for observations in pages for observation in observations]
     
     return all_observations[:count]
 
 
-def download_image(photo_url: str, output_path: Path) -> bool:
+async def download_image(client: httpx.AsyncClient, photo_url: str, output_path: Path) -> bool:
     """
     Faz o download de uma imagem a partir da URL.
     
     Args:
+        client: Cliente HTTP assíncrono compartilhado
         photo_url: URL da foto a ser baixada
         output_path: Caminho onde a imagem será salva
         
@@ -140,16 +178,16 @@ def download_image(photo_url: str, output_path: Path) -> bool:
         True se o download foi bem-sucedido, False caso contrário
     """
     try:
-        response = requests.get(photo_url, stream=True)
+        # As fotos têm de centenas de KB a poucos MB: ler o corpo inteiro e
+        # gravá-lo em uma única escrita evita o loop Python por bloco
+        response = await client.get(photo_url)
         response.raise_for_status()
         
         # Criar diretório pai se não existir
         output_path.parent.mkdir(parents=True, exist_ok=True)
         
         # Salvar a imagem
-        with open(output_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        output_path.write_bytes(response.content)
                 
         return True
     except Exception as e:
@@ -157,11 +195,17 @@ def download_image(photo_url: str, output_path: Path) -> bool:
         return False
 
 
-def process_observation(observation: Dict[str, Any], idx: int, output_dir: Path) -> Optional[Dict[str, Any]]:
+async def process_observation(
+    client: httpx.AsyncClient,
+    observation: Dict[str, Any],
+    idx: int,
+    output_dir: Path
+) -> Optional[Dict[str, Any]]:
     """
     Processa uma observação, baixa as imagens e extrai metadados.
     
     Args:
+        client: Cliente HTTP assíncrono compartilhado
         observation: Dados da observação do iNaturalist
         idx: Índice para nomeação única das imagens
         output_dir: Diretório base para salvar os dados
@@ -213,7 +257,7 @@ def process_observation(observation: Dict[str, Any], idx: int, output_dir: Path)
             img_path = full_path / img_filename
             
             # Fazer download da imagem
-            if download_image(photo_url, img_path):
+            if await download_image(client, photo_url, img_path):
                 # Retornar metadados apenas se pelo menos uma imagem foi baixada
                 return {
                     "filepath": str(Path("raw") / rel_path / img_filename),
@@ -233,6 +277,55 @@ def process_observation(observation: Dict[str, Any], idx: int, output_dir: Path)
     return None
 
 
+async def download_observations(
+    observations: List[Dict[str, Any]],
+    output_dir: Path,
+    csv_path: Path,
+    max_concurrency: int = 64
+) -> int:
+    """
+    Baixa as imagens de todas as observações de forma concorrente.
+    
+    Os metadados são gravados no CSV à medida que cada observação termina,
+    sem acumular todas as linhas em memória.
+    
+    Args:
+        observations: Observações retornadas pela API
+        output_dir: Diretório base para salvar os dados
+        csv_path: Caminho do arquivo CSV de metadados
+        max_concurrency: Número máximo de observações processadas em paralelo
+        
+    Returns:
+        Número de observações baixadas com sucesso
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    limits = httpx.Limits(max_connections=max_concurrency)
+    
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=METADATA_FIELDS)
+        writer.writeheader()
+        
+        async with httpx.AsyncClient(limits=limits, timeout=60.0, follow_redirects=True) as client:
+            async def process_bounded(observation: Dict[str, Any], idx: int) -> Optional[Dict[str, Any]]:
+                async with semaphore:
+                    return await process_observation(client, observation, idx, output_dir)
+            
+            tasks = [process_bounded(obs, i) for i, obs in enumerate(observations)]
+            
+            # Gravar cada linha assim que a observação termina
+            downloaded = 0
+            for task in tqdm(asyncio.as_completed(tasks),
+                             total=len(observations),
+                             desc="Processando observações"):
+                metadata = await task
+                if metadata:
+                    writer.writerow(metadata)
+                    csvfile.flush()
+                    downloaded += 1
+    
+    return downloaded
+
+
 def get_taxonomy_level(ancestry: List[str], taxon: Dict[str, Any], level_idx: int) -> str:
     """
     Obtém o nome de um nível taxonômico específico.
@@ -278,53 +371,23 @@ def main():
         return
     
     # Buscar observações
-    observations = fetch_observations(
+    observations = asyncio.run(fetch_observations(
         taxon_id=taxon_id,
         count=args.count,
         quality_grade=args.quality_grade,
         page_size=args.page_size
-    )
+    ))
     
     print(f"Coletadas {len(observations)} observações")
     
     # Processar observações e baixar imagens
     print("Baixando imagens e extraindo metadados...")
-    metadata_list = []
+    csv_path = base_dir / "labels.csv"
+    downloaded = asyncio.run(download_observations(observations, base_dir, csv_path))
     
-    # Usar ThreadPoolExecutor para downloads paralelos
-    with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
-        # Submeter tarefas
-        future_to_idx = {
-            executor.submit(process_observation, obs, i, base_dir): i 
-            for i, obs in enumerate(observations)
-        }
-        
-        # Processar resultados à medida que são concluídos
-        for future in tqdm(concurrent.futures.as_completed(future_to_idx), 
-                          total=len(observations),
-                          desc="Processando observações"):
-            idx = future_to_idx[future]
-            try:
-                metadata = future.result()
-                if metadata:
-                    metadata_list.append(metadata)
-            except Exception as e:
-                print(f"Observação {idx} gerou uma exceção: {e}")
-    
-    # Salvar metadados em CSV
-    if metadata_list:
-        csv_path = base_dir / "labels.csv"
-        fieldnames = ["filepath", "taxon_id", "scientific_name", "common_name", 
-                     "latitude", "longitude", "kingdom", "order", "family"]
-        
-        with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-            writer.writeheader()
-            for metadata in metadata_list:
-                writer.writerow(metadata)
-        
+    if downloaded:
         print(f"Metadados salvos em {csv_path}")
-        print(f"Total de {len(metadata_list)} imagens baixadas com sucesso")
+        print(f"Total de {downloaded} imagens baixadas com sucesso")
     else:
         print("Nenhuma imagem foi baixada com sucesso")
 
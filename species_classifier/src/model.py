@@ -6,6 +6,8 @@ Este módulo contém:
 1. Definição da arquitetura do modelo (ResNet50 modificada)
 2. Funções para carregar e salvar modelos
 3. Funções para extrair embeddings do modelo
+4. Exportação do modelo para ONNX
+5. Redução de precisão (FP16 na GPU, int8 na CPU)
 
 Classes:
     SpeciesClassifier: Modelo para classificação de espécies baseado em ResNet50
@@ -16,11 +18,13 @@ import json
 from pathlib import Path
 from typing import Dict, List, Tuple, Optional, Union
 
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 import torchvision.models as models
-from torchvision.transforms import Normalize
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
 
 
 class SpeciesClassifier(nn.Module):
@@ -57,10 +61,10 @@ class SpeciesClassifier(nn.Module):
         self.fc = nn.Linear(self.embedding_size, num_classes)
         
         # Normalização para pré-processamento (valores de média/std do ImageNet)
-        self.input_norm = Normalize(
-            mean=[0.485, 0.456, 0.406],
-            std=[0.229, 0.224, 0.225]
-        )
+        # como buffers: uma única operação elementwise que TorchScript, ONNX e
+        # torch.compile fundem ao grafo (não persistidos no state_dict)
+        self.register_buffer("mean", torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1), persistent=False)
+        self.register_buffer("std", torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1), persistent=False)
     
     def forward(self, x: torch.Tensor, return_embedding: bool = False) -> Union[torch.Tensor, Tuple[torch.Tensor, torch.Tensor]]:
         """
@@ -74,7 +78,7 @@ class SpeciesClassifier(nn.Module):
             Logits de classificação e embeddings (opcional)
         """
         # Normalizar entrada
-        x = self.input_norm(x)
+        x = (x - self.mean) / self.std
         
         # Passar pela backbone
         embedding = self.backbone(x)
@@ -87,6 +91,7 @@ class SpeciesClassifier(nn.Module):
             return logits, embedding
         return logits
     
+    @torch.inference_mode()
     def extract_embedding(self, x: torch.Tensor) -> torch.Tensor:
         """
         Extrai embeddings (features) do penúltimo layer.
@@ -98,12 +103,11 @@ class SpeciesClassifier(nn.Module):
             Embeddings extraídos
         """
         # Normalizar entrada
-        x = self.input_norm(x)
+        x = (x - self.mean) / self.std
         
         # Extracao do embedding
-        with torch.no_grad():
-            embedding = self.backbone(x)
-            embedding = embedding.view(embedding.size(0), -1)
+        embedding = self.backbone(x)
+        embedding = embedding.view(embedding.size(0), -1)
         
         return embedding
 
@@ -140,16 +144,83 @@ def save_model(model: nn.Module, save_path: Path, class_to_idx: Dict[str, int])
     print(f"Mapeamento de classes salvo em {class_mapping_path}")
 
 
-def load_model(model_path: Path, device: torch.device = torch.device('cpu')) -> Tuple[nn.Module, Dict[str, int]]:
+def quantize_model(
+    model: SpeciesClassifier,
+    device: torch.device,
+    calibration_images: Optional[torch.Tensor] = None
+) -> nn.Module:
+    """
+    Reduz a precisão do modelo para inferência.
+    
+    Na GPU converte o modelo para FP16. Na CPU aplica quantização int8:
+    dinâmica na camada de classificação e, se houver imagens de calibração,
+    estática (FX) na backbone.
+    
+    Args:
+        model: Modelo em modo de avaliação
+        device: Dispositivo do modelo (CPU/GPU)
+        calibration_images: Batch de imagens pré-processadas (valores 0-1)
+            usado para calibrar a quantização estática da backbone
+        
+    Returns:
+        Modelo com precisão reduzida
+    """
+    if device.type == 'cuda':
+        return model.half()
+    
+    if calibration_images is not None:
+        # A backbone recebe imagens já normalizadas
+        calibration_inputs = (calibration_images - model.mean) / model.std
+        
+        qconfig_mapping = get_default_qconfig_mapping("x86")
+        backbone = prepare_fx(model.backbone, qconfig_mapping, example_inputs=(calibration_inputs[:1],))
+        with torch.no_grad():
+            backbone(calibration_inputs)
+        model.backbone = convert_fx(backbone)
+    
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def build_idx_to_class(class_to_idx: Dict[str, int]) -> np.ndarray:
+    """
+    Cria o array de nomes de classes indexado pelo índice da classe.
+    
+    Args:
+        class_to_idx: Mapeamento de classes para índices
+        
+    Returns:
+        Array (num_classes,) com o nome de cada classe na sua posição
+    """
+    idx_to_class = np.empty(len(class_to_idx), dtype=object)
+    for cls, idx in class_to_idx.items():
+        idx_to_class[idx] = cls
+    return idx_to_class
+
+
+def load_model(
+    model_path: Path,
+    device: torch.device = torch.device('cpu'),
+    optimize: bool = False,
+    quantize: bool = False,
+    calibration_images: Optional[torch.Tensor] = None,
+    channels_last: bool = False
+) -> Tuple[nn.Module, Dict[str, int]]:
     """
     Carrega um modelo salvo.
     
     Args:
         model_path: Caminho para o arquivo do modelo
         device: Dispositivo para carregar o modelo (CPU/GPU)
+        optimize: Se True, converte o modelo para TorchScript e aplica
+            torch.jit.optimize_for_inference (fusão Conv+BN, MKLDNN na CPU)
+        quantize: Se True, reduz a precisão do modelo (ver quantize_model)
+        calibration_images: Imagens para calibrar a quantização int8 na CPU
+        channels_last: Se True, usa o layout NHWC (channels_last) nos pesos,
+            o que permite ao cuDNN usar kernels de Tensor Cores
         
     Returns:
-        Modelo carregado e mapeamento de classes
+        Modelo carregado (com o atributo idx_to_class, ver
+        build_idx_to_class) e mapeamento de classes
     """
     # Carregar checkpoint
     checkpoint = torch.load(model_path, map_location=device)
@@ -166,4 +237,75 @@ def load_model(model_path: Path, device: torch.device = torch.device('cpu')) ->
     model.to(device)
     model.eval()
     
-    return model, class_to_idx
\ No newline at end of file
+    if channels_last:
+        model = model.to(memory_format=torch.channels_last)
+    
+    if quantize:
+        model = quantize_model(model, device, calibration_images)
+    
+    if optimize:
+        model = torch.jit.script(model)
+        model = torch.jit.optimize_for_inference(model)
+    
+    # Nomes das classes por índice, calculados uma única vez
+    model.idx_to_class = build_idx_to_class(class_to_idx)
+    
+    return model, class_to_idx
+
+
+class _EmbeddingOutputWrapper(nn.Module):
+    """Expõe logits e embeddings como saídas fixas do grafo exportado."""
+
+    def __init__(self, model: nn.Module):
+        super(_EmbeddingOutputWrapper, self).__init__()
+        self.model = model
+
+    def forward(self, x: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        return self.model(x, return_embedding=True)
+
+
+def export_onnx(
+    model: nn.Module,
+    onnx_path: Path,
+    image_size: Tuple[int, int] = (224, 224),
+    opset_version: int = 17
+) -> Path:
+    """
+    Exporta o modelo para ONNX com saídas (logits, embedding).
+    
+    O grafo exportado tem batch dinâmico, de modo que uma única sessão do
+    ONNX Runtime atende tanto a classificação quanto a extração de embeddings.
+    
+    Args:
+        model: Modelo treinado (em modo de avaliação)
+        onnx_path: Caminho do arquivo ONNX a ser gerado
+        image_size: Tamanho (altura, largura) da imagem de entrada
+        opset_version: Versão do opset ONNX
+        
+    Returns:
+        Caminho do arquivo ONNX gerado
+    """
+    onnx_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    # Entrada de exemplo no mesmo dispositivo do modelo
+    device = next(model.parameters()).device
+    dummy_input = torch.zeros(1, 3, *image_size, device=device)
+    
+    wrapper = _EmbeddingOutputWrapper(model).eval()
+    with torch.no_grad():
+        torch.onnx.export(
+            wrapper,
+            dummy_input,
+            str(onnx_path),
+            opset_version=opset_version,
+            input_names=["input"],
+            output_names=["logits", "embedding"],
+            dynamic_axes={
+                "input": {0: "N"},
+                "logits": {0: "N"},
+                "embedding": {0: "N"}
+            }
+        )
+    
+    print(f"Modelo exportado para ONNX em {onnx_path}")
+    return onnx_path
@@ -15,16 +15,31 @@ Uso:
 
 import os
 import csv
+import json
 import argparse
 import random
-import shutil
+import hashlib
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Tuple
+from typing import Dict, Iterator, List, Tuple
 
+import cv2
 import numpy as np
 import pandas as pd
 from tqdm import tqdm
-from PIL import Image, ImageEnhance, ImageOps
+
+
+# Número de imagens geradas por chamada de apply_augmentation
+# (rotação, flip horizontal, brilho e contraste)
+NUM_AUGMENTED = 4
+
+# Parâmetros de gravação das imagens processadas
+JPEG_PARAMS = [cv2.IMWRITE_JPEG_QUALITY, 90]
+
+# Threads de gravação de cada processo do pool (cv2.imwrite libera o GIL,
+# então a codificação JPEG se sobrepõe ao cálculo das augmentations)
+_writer_pool = None
 
 
 def parse_args() -> argparse.Namespace:
@@ -38,49 +53,122 @@ def parse_args() -> argparse.Namespace:
                         help='Número de imagens aumentadas por imagem original')
     parser.add_argument('--seed', type=int, default=42,
                         help='Seed para reprodutibilidade')
+    parser.add_argument('--num_workers', type=int, default=max(1, (os.cpu_count() or 2) - 1),
+                        help='Número de processos para processar as imagens')
+    parser.add_argument('--pack', action='store_true',
+                        help='Empacotar também as imagens processadas em arrays uint8 '
+                             'decodificados (processed/packed), lidos via memory-map no treino')
     return parser.parse_args()
 
 
-def resize_image(img: Image.Image, target_size: Tuple[int, int] = (224, 224)) -> Image.Image:
+def read_image(path: Path) -> np.ndarray:
+    """
+    Carrega uma imagem do disco com OpenCV.
+    
+    Args:
+        path: Caminho da imagem
+        
+    Returns:
+        Imagem BGR (altura, largura, 3) em uint8
+    """
+    img = cv2.imread(str(path), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError(f"Não foi possível decodificar a imagem: {path}")
+    return img
+
+
+def resize_image(img: np.ndarray, target_size: Tuple[int, int] = (224, 224)) -> np.ndarray:
     """
     Redimensiona uma imagem para o tamanho alvo, preservando a proporção.
     
     Args:
-        img: Imagem a ser redimensionada
+        img: Imagem (altura, largura, 3) a ser redimensionada
         target_size: Tamanho alvo (largura, altura)
         
     Returns:
-        Imagem redimensionada
+        Imagem redimensionada, centralizada com bordas pretas
     """
-    # Converter para RGB (caso seja RGBA, por exemplo)
-    if img.mode != 'RGB':
-        img = img.convert('RGB')
-    
     # Calcular proporção
-    width, height = img.size
+    height, width = img.shape[:2]
     ratio = min(target_size[0] / width, target_size[1] / height)
     
-    # Novo tamanho preservando proporção
+    # Novo tamanho preservando proporção (INTER_AREA evita aliasing na redução)
     new_size = (int(width * ratio), int(height * ratio))
-    resized_img = img.resize(new_size, Image.LANCZOS)
+    interpolation = cv2.INTER_AREA if ratio < 1 else cv2.INTER_LANCZOS4
+    resized_img = cv2.resize(img, new_size, interpolation=interpolation)
     
-    # Criar nova imagem com o tamanho alvo
-    new_img = Image.new('RGB', target_size, (0, 0, 0))
+    # Completar com bordas pretas, mantendo a imagem centralizada
+    pad_x = target_size[0] - new_size[0]
+    pad_y = target_size[1] - new_size[1]
+    return cv2.copyMakeBorder(
+        resized_img,
+        pad_y // 2, pad_y - pad_y // 2,
+        pad_x // 2, pad_x - pad_x // 2,
+        cv2.BORDER_CONSTANT, value=(0, 0, 0)
+    )
+
+
+def adjust_brightness(img: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Multiplica o brilho de uma imagem (equivalente a ImageEnhance.Brightness).
     
-    # Colar a imagem redimensionada centralizada
-    paste_x = (target_size[0] - new_size[0]) // 2
-    paste_y = (target_size[1] - new_size[1]) // 2
-    new_img.paste(resized_img, (paste_x, paste_y))
+    Args:
+        img: Imagem uint8
+        factor: Fator de brilho (1.0 mantém a imagem)
+        
+    Returns:
+        Imagem uint8 ajustada
+    """
+    return np.clip(img.astype(np.float32) * factor, 0, 255).astype(np.uint8)
+
+
+def adjust_contrast(img: np.ndarray, factor: float) -> np.ndarray:
+    """
+    Ajusta o contraste em torno da intensidade média da imagem
+    (equivalente a ImageEnhance.Contrast).
+    
+    Args:
+        img: Imagem uint8
+        factor: Fator de contraste (1.0 mantém a imagem)
+        
+    Returns:
+        Imagem uint8 ajustada
+    """
+    arr = img.astype(np.float32)
+    mean = arr.mean()
+    return np.clip(mean + (arr - mean) * factor, 0, 255).astype(np.uint8)
+
+
+def rotate_image(img: np.ndarray, angle: float) -> np.ndarray:
+    """
+    Rotaciona uma imagem em torno do centro, mantendo o tamanho.
     
-    return new_img
+    Args:
+        img: Imagem (altura, largura, 3)
+        angle: Ângulo em graus (positivo no sentido anti-horário)
+        
+    Returns:
+        Imagem rotacionada, com bordas pretas
+    """
+    height, width = img.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(
+        img, matrix, (width, height),
+        flags=cv2.INTER_CUBIC,
+        borderMode=cv2.BORDER_CONSTANT,
+        borderValue=(0, 0, 0)
+    )
 
 
-def apply_augmentation(img: Image.Image) -> List[Image.Image]:
+def apply_augmentation(img: np.ndarray) -> List[np.ndarray]:
     """
     Aplica data augmentation a uma imagem.
     
+    Todos os parâmetros aleatórios vêm do módulo random, semeado por imagem
+    em _process_train_image.
+    
     Args:
-        img: Imagem original
+        img: Imagem original (altura, largura, 3)
         
     Returns:
         Lista de imagens aumentadas
@@ -88,34 +176,216 @@ def apply_augmentation(img: Image.Image) -> List[Image.Image]:
     augmented = []
     
     # Rotação aleatória entre -20 e 20 graus
-    angle = random.uniform(-20, 20)
-    augmented.append(img.rotate(angle, resample=Image.BICUBIC, expand=False))
+    augmented.append(rotate_image(img, random.uniform(-20, 20)))
     
     # Flip horizontal
-    augmented.append(ImageOps.mirror(img))
+    augmented.append(cv2.flip(img, 1))
     
     # Ajuste de brilho aleatório
-    brightness_factor = random.uniform(0.8, 1.2)
-    enhancer = ImageEnhance.Brightness(img)
-    augmented.append(enhancer.enhance(brightness_factor))
+    augmented.append(adjust_brightness(img, random.uniform(0.8, 1.2)))
     
     # Ajuste de contraste aleatório
-    contrast_factor = random.uniform(0.8, 1.2)
-    enhancer = ImageEnhance.Contrast(img)
-    augmented.append(enhancer.enhance(contrast_factor))
+    augmented.append(adjust_contrast(img, random.uniform(0.8, 1.2)))
     
     return augmented
 
 
-def prepare_dataset(data_dir: Path, split: float, augment_factor: int, seed: int) -> pd.DataFrame:
+def scan_files(root: Path) -> Iterator[os.DirEntry]:
+    """
+    Percorre recursivamente os arquivos de um diretório com os.scandir.
+    
+    Args:
+        root: Diretório raiz (ignorado se não existir)
+        
+    Yields:
+        Entrada de cada arquivo encontrado
+    """
+    pending = [str(root)]
+    
+    while pending:
+        try:
+            with os.scandir(pending.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                    else:
+                        yield entry
+        except FileNotFoundError:
+            continue
+
+
+def image_signature(filepath: str, mtime_ns: int, *params) -> str:
+    """
+    Calcula a assinatura de uma imagem processada.
+    
+    A assinatura muda quando a imagem bruta ou os parâmetros que afetam o
+    resultado mudam, e faz parte do nome dos arquivos gerados.
+    
+    Args:
+        filepath: Caminho da imagem bruta (como em labels.csv)
+        mtime_ns: Data de modificação da imagem bruta
+        *params: Parâmetros do processamento
+        
+    Returns:
+        Assinatura hexadecimal de 16 caracteres
+    """
+    key = "|".join(str(value) for value in (filepath, mtime_ns) + params)
+    return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def train_output_names(stem: str, sig: str, augment_factor: int) -> List[str]:
+    """
+    Nomes dos arquivos gerados para uma imagem de treino.
+    
+    Args:
+        stem: Nome da imagem bruta, sem extensão
+        sig: Assinatura da imagem (ver image_signature)
+        augment_factor: Número de rodadas de augmentation
+        
+    Returns:
+        Nome da imagem original seguido dos nomes das imagens aumentadas
+    """
+    names = [f"{stem}_{sig}_orig.jpg"]
+    names.extend(
+        f"{stem}_{sig}_aug_{i}_{j}.jpg"
+        for i in range(augment_factor)
+        for j in range(NUM_AUGMENTED)
+    )
+    return names
+
+
+def _init_cv2_threads():
+    """
+    Limita o OpenCV a uma thread por processo do pool.
+    
+    O paralelismo já vem dos processos; o pool de threads padrão do OpenCV em
+    cada um deles disputaria os mesmos núcleos.
+    """
+    cv2.setNumThreads(1)
+
+
+def _init_worker(num_writers: int):
+    """
+    Inicializa um processo do pool com suas threads de gravação.
+    
+    Args:
+        num_writers: Número de threads de gravação por processo
+    """
+    global _writer_pool
+    _init_cv2_threads()
+    _writer_pool = ThreadPoolExecutor(max_workers=num_writers)
+
+
+def write_image(path: Path, img: np.ndarray):
+    """
+    Codifica e salva uma imagem em JPEG.
+    
+    Args:
+        path: Caminho de destino
+        img: Imagem BGR (altura, largura, 3)
+    """
+    if not cv2.imwrite(str(path), img, JPEG_PARAMS):
+        raise IOError(f"Não foi possível salvar a imagem: {path}")
+
+
+def _process_train_image(task: Tuple[Path, Path, str, int, int, str]) -> Tuple[str, List[str]]:
+    """
+    Redimensiona uma imagem de treino e gera suas versões aumentadas.
+    
+    Executada nos processos do pool; a seed é derivada da imagem para que o
+    resultado não dependa de qual processo a executa.
+    
+    Args:
+        task: Tupla (src_path, class_dir, species, augment_factor, seed, sig)
+        
+    Returns:
+        Espécie e caminhos das imagens geradas
+    """
+    src_path, class_dir, species, augment_factor, seed, sig = task
+    output_names = iter(train_output_names(src_path.stem, sig, augment_factor))
+    random.seed(f"{seed}:{sig}")
+    filepaths = []
+    writes = []
+    
+    try:
+        # Processar imagem original (decodificada uma única vez; as
+        # augmentations partem do array em memória)
+        img = read_image(src_path)
+        img_resized = resize_image(img)
+        
+        # Salvar imagem original redimensionada
+        original_filename = next(output_names)
+        writes.append(_writer_pool.submit(write_image, class_dir / original_filename, img_resized))
+        filepaths.append(str(class_dir / original_filename))
+        
+        # Aplicar augmentation
+        for i in range(augment_factor):
+            augmented_images = apply_augmentation(img_resized)
+            
+            # Salvar imagens aumentadas
+            for j, aug_img in enumerate(augmented_images):
+                aug_filename = next(output_names)
+                writes.append(_writer_pool.submit(write_image, class_dir / aug_filename, aug_img))
+                filepaths.append(str(class_dir / aug_filename))
+        
+        # Aguardar a gravação antes de reportar os caminhos
+        for write in writes:
+            write.result()
+    except Exception as e:
+        print(f"Erro ao processar {src_path}: {e}")
+        return species, []
+    
+    return species, filepaths
+
+
+def _process_val_image(task: Tuple[Path, Path, str, str]) -> Tuple[str, List[str]]:
+    """
+    Redimensiona uma imagem de validação (sem augmentation).
+    
+    Args:
+        task: Tupla (src_path, class_dir, species, sig)
+        
+    Returns:
+        Espécie e caminho da imagem gerada (lista vazia se a imagem falhar)
+    """
+    src_path, class_dir, species, sig = task
+    
+    try:
+        # Processar imagem
+        img = read_image(src_path)
+        img_resized = resize_image(img)
+        
+        # Salvar imagem redimensionada
+        dest_filename = f"{src_path.stem}_{sig}.jpg"
+        write_image(class_dir / dest_filename, img_resized)
+        
+        return species, [str(class_dir / dest_filename)]
+    except Exception as e:
+        print(f"Erro ao processar {src_path}: {e}")
+        return species, []
+
+
+def prepare_dataset(
+    data_dir: Path,
+    split: float,
+    augment_factor: int,
+    seed: int,
+    num_workers: int = 1
+) -> pd.DataFrame:
     """
     Prepara o dataset dividindo em conjuntos de treino e validação.
     
+    O processamento é incremental: os arquivos gerados levam no nome uma
+    assinatura da imagem bruta e dos parâmetros, imagens cujos arquivos já
+    existem não são reprocessadas e arquivos que deixaram de ser gerados
+    (imagens removidas, parâmetros alterados) são apagados ao final.
+    
     Args:
         data_dir: Diretório contendo os dados
         split: Proporção de divisão treino/validação (0-1)
         augment_factor: Número de imagens aumentadas por imagem original
         seed: Seed para reprodutibilidade
+        num_workers: Número de processos para processar as imagens
         
     Returns:
         DataFrame contendo os caminhos das imagens e seus rótulos
@@ -130,12 +400,6 @@ def prepare_dataset(data_dir: Path, split: float, augment_factor: int, seed: int
     train_dir = processed_dir / "train"
     val_dir = processed_dir / "val"
     
-    # Limpar diretórios de processamento anteriores
-    if train_dir.exists():
-        shutil.rmtree(train_dir)
-    if val_dir.exists():
-        shutil.rmtree(val_dir)
-    
     # Criar diretórios
     train_dir.mkdir(parents=True, exist_ok=True)
     val_dir.mkdir(parents=True, exist_ok=True)
@@ -152,110 +416,187 @@ def prepare_dataset(data_dir: Path, split: float, augment_factor: int, seed: int
     species_groups = df.groupby('scientific_name')
     species_list = list(species_groups.groups.keys())
     
-    # Preparar DataFrames para treino/validação
-    train_data = []
-    val_data = []
+    # Arquivos brutos existentes (com data de modificação) e arquivos já
+    # processados, listados uma única vez
+    raw_files = {entry.path: entry.stat().st_mtime_ns for entry in scan_files(raw_dir)}
+    processed_files = {entry.path for entry in scan_files(train_dir)}
+    processed_files.update(entry.path for entry in scan_files(val_dir))
+    
+    # Colunas do DataFrame, arquivos esperados e tarefas pendentes
+    # (diretórios criados aqui, em série)
+    filepaths = []
+    classes = []
+    splits = []
+    expected_files = set()
+    train_tasks = []
+    val_tasks = []
+    
+    def add_existing(species: str, split_name: str, outputs: List[str]) -> bool:
+        """Registra as saídas de uma imagem; retorna True se já existirem."""
+        expected_files.update(outputs)
+        if not all(path in processed_files for path in outputs):
+            return False
+        
+        filepaths.extend(outputs)
+        classes.extend([species] * len(outputs))
+        splits.extend([split_name] * len(outputs))
+        return True
     
-    # Processar cada espécie
-    for species in tqdm(species_list, desc="Processando espécies"):
+    for species in species_list:
         species_df = species_groups.get_group(species)
         
-        # Embaralhar imagens da espécie
-        species_rows = species_df.sample(frac=1, random_state=seed).reset_index(drop=True)
+        # Embaralhar imagens da espécie (apenas a coluna usada, como array)
+        species_paths = species_df['filepath'].sample(frac=1, random_state=seed).to_numpy()
         
         # Calcular ponto de divisão
-        split_idx = int(len(species_rows) * split)
+        split_idx = int(len(species_paths) * split)
         
         # Dividir em treino e validação
-        train_species = species_rows.iloc[:split_idx]
-        val_species = species_rows.iloc[split_idx:]
+        train_species = species_paths[:split_idx]
+        val_species = species_paths[split_idx:]
         
-        # Processar imagens de treino (com augmentation)
-        for _, row in train_species.iterrows():
-            src_path = data_dir / row['filepath']
-            if not src_path.exists():
+        for filepath in train_species:
+            src_path = data_dir / filepath
+            mtime_ns = raw_files.get(str(src_path))
+            if mtime_ns is None:
                 continue
             
-            # Criar diretório de destino
             class_dir = train_dir / species.replace(' ', '_')
-            class_dir.mkdir(exist_ok=True)
+            sig = image_signature(filepath, mtime_ns, augment_factor, seed)
+            outputs = [str(class_dir / name) for name in train_output_names(src_path.stem, sig, augment_factor)]
+            if add_existing(species, 'train', outputs):
+                continue
             
-            try:
-                # Processar imagem original
-                img = Image.open(src_path)
-                img_resized = resize_image(img)
-                
-                # Salvar imagem original redimensionada
-                original_filename = f"{src_path.stem}_orig.jpg"
-                img_resized.save(class_dir / original_filename)
-                
-                # Adicionar ao DataFrame de treino
-                train_data.append({
-                    'filepath': str(class_dir / original_filename),
-                    'class': species,
-                    'split': 'train'
-                })
-                
-                # Aplicar augmentation
-                for i in range(augment_factor):
-                    augmented_images = apply_augmentation(img_resized)
-                    
-                    # Salvar imagens aumentadas
-                    for j, aug_img in enumerate(augmented_images):
-                        aug_filename = f"{src_path.stem}_aug_{i}_{j}.jpg"
-                        aug_img.save(class_dir / aug_filename)
-                        
-                        # Adicionar ao DataFrame de treino
-                        train_data.append({
-                            'filepath': str(class_dir / aug_filename),
-                            'class': species,
-                            'split': 'train'
-                        })
-            except Exception as e:
-                print(f"Erro ao processar {src_path}: {e}")
+            class_dir.mkdir(exist_ok=True)
+            train_tasks.append((src_path, class_dir, species, augment_factor, seed, sig))
         
-        # Processar imagens de validação (sem augmentation)
-        for _, row in val_species.iterrows():
-            src_path = data_dir / row['filepath']
-            if not src_path.exists():
+        for filepath in val_species:
+            src_path = data_dir / filepath
+            mtime_ns = raw_files.get(str(src_path))
+            if mtime_ns is None:
                 continue
             
-            # Criar diretório de destino
             class_dir = val_dir / species.replace(' ', '_')
-            class_dir.mkdir(exist_ok=True)
+            sig = image_signature(filepath, mtime_ns)
+            if add_existing(species, 'val', [str(class_dir / f"{src_path.stem}_{sig}.jpg")]):
+                continue
             
-            try:
-                # Processar imagem
-                img = Image.open(src_path)
-                img_resized = resize_image(img)
-                
-                # Salvar imagem redimensionada
-                dest_filename = f"{src_path.stem}.jpg"
-                img_resized.save(class_dir / dest_filename)
-                
-                # Adicionar ao DataFrame de validação
-                val_data.append({
-                    'filepath': str(class_dir / dest_filename),
-                    'class': species,
-                    'split': 'val'
-                })
-            except Exception as e:
-                print(f"Erro ao processar {src_path}: {e}")
-    
-    # Combinar dados de treino e validação
-    all_data = pd.DataFrame(train_data + val_data)
+            class_dir.mkdir(exist_ok=True)
+            val_tasks.append((src_path, class_dir, species, sig))
+    
+    print(f"{len(filepaths)} imagens já processadas; "
+          f"{len(train_tasks) + len(val_tasks)} imagens brutas a processar")
+    
+    # Processar imagens pendentes em paralelo
+    with multiprocessing.Pool(processes=num_workers, initializer=_init_worker, initargs=(2,)) as pool, \
+            tqdm(total=len(train_tasks) + len(val_tasks), desc="Processando imagens") as progress:
+        for split_name, process_fn, tasks in (
+            ('train', _process_train_image, train_tasks),
+            ('val', _process_val_image, val_tasks)
+        ):
+            for species, paths in pool.imap_unordered(process_fn, tasks, chunksize=16):
+                filepaths.extend(paths)
+                classes.extend([species] * len(paths))
+                splits.extend([split_name] * len(paths))
+                progress.update(1)
+    
+    # Remover arquivos que não fazem mais parte do dataset e diretórios vazios
+    stale_files = processed_files - expected_files
+    for path in stale_files:
+        os.remove(path)
+    
+    for class_dir in [*train_dir.iterdir(), *val_dir.iterdir()]:
+        if class_dir.is_dir() and not any(class_dir.iterdir()):
+            class_dir.rmdir()
+    
+    if stale_files:
+        print(f"Removidos {len(stale_files)} arquivos obsoletos")
+    
+    # Montar o DataFrame a partir das colunas
+    all_data = pd.DataFrame({'filepath': filepaths, 'class': classes, 'split': splits})
     
     # Salvar informações de divisão
     processed_info_path = processed_dir / "processed_info.csv"
     all_data.to_csv(processed_info_path, index=False)
     
-    print(f"Treino: {len(train_data)} imagens")
-    print(f"Validação: {len(val_data)} imagens")
+    num_train = int((all_data['split'] == 'train').sum())
+    print(f"Treino: {num_train} imagens")
+    print(f"Validação: {len(all_data) - num_train} imagens")
     print(f"Total: {len(all_data)} imagens processadas")
     
     return all_data
 
 
+def _read_packed_image(path: str) -> np.ndarray:
+    """
+    Carrega uma imagem processada no formato do pacote.
+    
+    Args:
+        path: Caminho da imagem processada
+        
+    Returns:
+        Imagem RGB (3, altura, largura) em uint8
+    """
+    img = cv2.cvtColor(read_image(Path(path)), cv2.COLOR_BGR2RGB)
+    return img.transpose(2, 0, 1)
+
+
+def pack_dataset(
+    dataset_df: pd.DataFrame,
+    pack_dir: Path,
+    num_workers: int = 1,
+    image_size: Tuple[int, int] = (224, 224)
+):
+    """
+    Empacota as imagens processadas em arrays NumPy uint8 já decodificados.
+    
+    Para cada split são gravados {split}_images.npy (N, 3, altura, largura) e
+    {split}_labels.npy (N,), além de classes.json com os nomes das classes na
+    mesma ordem do ImageFolder. O treino lê os arrays via memory-map, sem
+    decodificar JPEGs a cada época.
+    
+    Args:
+        dataset_df: DataFrame retornado por prepare_dataset
+        pack_dir: Diretório de saída
+        num_workers: Número de processos para decodificar as imagens
+        image_size: Tamanho (largura, altura) das imagens processadas
+    """
+    pack_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Classes ordenadas pelo nome do diretório, como no ImageFolder
+    class_dirs = dataset_df['filepath'].map(lambda path: Path(path).parent.name)
+    classes = sorted(class_dirs.unique())
+    class_to_idx = {class_name: idx for idx, class_name in enumerate(classes)}
+    
+    with open(pack_dir / "classes.json", 'w') as f:
+        json.dump(classes, f, ensure_ascii=False)
+    
+    with multiprocessing.Pool(processes=num_workers, initializer=_init_cv2_threads) as pool:
+        for split in ('train', 'val'):
+            split_mask = (dataset_df['split'] == split).to_numpy()
+            paths = dataset_df['filepath'].to_numpy()[split_mask]
+            labels = class_dirs.map(class_to_idx).to_numpy()[split_mask].astype(np.int64)
+            
+            # Gravar diretamente no arquivo, sem manter o dataset em memória
+            images = np.lib.format.open_memmap(
+                pack_dir / f"{split}_images.npy",
+                mode='w+',
+                dtype=np.uint8,
+                shape=(len(paths), 3, image_size[1], image_size[0])
+            )
+            
+            loaded = pool.imap(_read_packed_image, paths, chunksize=64)
+            for i, img in enumerate(tqdm(loaded, total=len(paths), desc=f"Empacotando {split}")):
+                images[i] = img
+            
+            images.flush()
+            del images
+            
+            np.save(pack_dir / f"{split}_labels.npy", labels)
+    
+    print(f"Pacote salvo em {pack_dir}")
+
+
 def main():
     """Função principal."""
     args = parse_args()
@@ -270,9 +611,14 @@ def main():
         data_dir=data_dir,
         split=args.split,
         augment_factor=args.augment_factor,
-        seed=args.seed
+        seed=args.seed,
+        num_workers=args.num_workers
     )
     
+    # Empacotar imagens decodificadas para o treino
+    if args.pack:
+        pack_dataset(dataset_df, data_dir / "processed" / "packed", num_workers=args.num_workers)
+    
     print("Pré-processamento concluído!")
     print(f"Salvo em {data_dir}/processed/")
 
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Busca por similaridade sobre embeddings quantizados em int8.
+
+Este módulo contém:
+1. Quantização int8 simétrica de embeddings (escala por vetor)
+2. Índice de busca exata por produto interno em tensores PyTorch (GPU/CPU),
+   usado quando o FAISS não tem suporte a GPU
+
+Classes:
+    Int8EmbeddingIndex: Índice int8 com interface compatível com faiss.Index
+"""
+
+from pathlib import Path
+from typing import Tuple
+
+import numpy as np
+import torch
+import faiss
+
+
+def quantize_embeddings_int8(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantiza embeddings para int8 com uma escala por vetor.
+    
+    Args:
+        embeddings: Matriz (N, D) de embeddings float32
+    
+    Returns:
+        Embeddings int8 (N, D) e escalas float32 (N,) tais que
+        embeddings ≈ quantizados * escalas[:, None]
+    """
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    
+    quantized = np.clip(np.round(embeddings / scales[:, None]), -128, 127).astype(np.int8)
+    
+    return quantized, scales.astype(np.float32)
+
+
+class Int8EmbeddingIndex:
+    """
+    Índice de busca exata por produto interno sobre embeddings int8.
+    
+    Os embeddings ficam no dispositivo em int8 (1/4 da memória em FP32) e são
+    convertidos em blocos no momento da busca, que é feita com um matmul
+    contra o batch de consultas seguido de torch.topk.
+    
+    Atributos:
+        embeddings_q: Tensor (N, D) de embeddings int8
+        scales: Tensor (N,) de escalas por embedding
+        metric_type: Métrica no padrão FAISS (produto interno)
+    """
+    
+    metric_type = faiss.METRIC_INNER_PRODUCT
+    
+    def __init__(
+        self,
+        embeddings_q: np.ndarray,
+        scales: np.ndarray,
+        device: torch.device,
+        chunk_size: int = 65536
+    ):
+        """
+        Inicializa o índice.
+        
+        Args:
+            embeddings_q: Embeddings quantizados (N, D) em int8
+            scales: Escalas (N,) retornadas por quantize_embeddings_int8
+            device: Dispositivo onde os embeddings ficarão armazenados
+            chunk_size: Número de embeddings convertidos por bloco na busca
+        """
+        self.device = device
+        self.chunk_size = chunk_size
+        self.embeddings_q = torch.from_numpy(embeddings_q).to(device)
+        self.scales = torch.from_numpy(scales).to(device)
+    
+    @property
+    def ntotal(self) -> int:
+        """Número de embeddings indexados."""
+        return self.embeddings_q.shape[0]
+    
+    @classmethod
+    def load(cls, model_dir: Path, device: torch.device) -> "Int8EmbeddingIndex":
+        """
+        Carrega os embeddings int8 salvos por build_index.py.
+        
+        Args:
+            model_dir: Diretório com embeddings_int8.npy e embedding_scales.npy
+            device: Dispositivo para a busca
+        
+        Returns:
+            Índice carregado
+        """
+        embeddings_q = np.load(model_dir / "embeddings_int8.npy")
+        scales = np.load(model_dir / "embedding_scales.npy")
+        return cls(embeddings_q, scales, device)
+    
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca os k embeddings com maior produto interno.
+        
+        Args:
+            queries: Matriz (B, D) de consultas float32
+            k: Número de vizinhos a retornar
+        
+        Returns:
+            Scores (B, k) e índices (B, k), no mesmo formato do faiss.Index.search
+        """
+        queries_q, query_scales = quantize_embeddings_int8(queries)
+        queries_q = torch.from_numpy(queries_q).to(self.device).float()
+        query_scales = torch.from_numpy(query_scales).to(self.device)
+        
+        # Produto interno bloco a bloco para limitar a memória temporária
+        scores = []
+        for start in range(0, self.ntotal, self.chunk_size):
+            chunk = self.embeddings_q[start:start + self.chunk_size].float()
+            scores.append(torch.matmul(queries_q, chunk.T) * self.scales[start:start + self.chunk_size])
+        scores = torch.cat(scores, dim=1) * query_scales[:, None]
+        
+        top_scores, top_indices = torch.topk(scores, min(k, self.ntotal), dim=1)
+        
+        return top_scores.cpu().numpy(), top_indices.cpu().numpy()
@@ -14,6 +14,7 @@ Uso:
 """
 
 import os
+import json
 import time
 import argparse
 import random
@@ -26,13 +27,21 @@ import pandas as pd
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import DataLoader
+import kornia.augmentation as K
+from torch.utils.data import DataLoader, Dataset
+from torch.utils.data.dataloader import default_collate
 from torchvision import datasets, transforms
+from torchvision.io import read_image, read_file, decode_jpeg, ImageReadMode
 from tqdm import tqdm
 
 from model import SpeciesClassifier, save_model
 
 
+# Estatísticas de normalização do ImageNet
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
+
 def parse_args() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Treinar modelo de classificação de espécies')
@@ -54,15 +63,32 @@ def parse_args() -> argparse.Namespace:
                         help='Número de workers para DataLoader')
     parser.add_argument('--seed', type=int, default=42,
                         help='Seed para reprodutibilidade')
+    parser.add_argument('--gpu_decode', action='store_true',
+                        help='Decodificar os JPEGs no dispositivo (nvJPEG na GPU); '
+                             'os workers apenas leem os bytes')
+    parser.add_argument('--packed', action='store_true',
+                        help='Ler as imagens do pacote gerado por preprocessing.py --pack')
+    parser.add_argument('--no_amp', action='store_true',
+                        help='Desativar o treinamento em precisão mista (AMP) na GPU')
+    parser.add_argument('--compile', action='store_true',
+                        help='Compilar o modelo com torch.compile')
+    parser.add_argument('--deterministic', action='store_true',
+                        help='Usar kernels determinísticos do cuDNN (mais lentos), '
+                             'para execuções reprodutíveis')
     return parser.parse_args()
 
 
-def set_seed(seed: int) -> None:
+def set_seed(seed: int, deterministic: bool = False) -> None:
     """
     Define seeds para garantir reprodutibilidade.
     
+    Sem deterministic, o cuDNN escolhe o algoritmo mais rápido para cada
+    forma de entrada (benchmark) e as multiplicações de matrizes em FP32
+    podem usar TF32.
+    
     Args:
         seed: Valor da seed
+        deterministic: Se True, força kernels determinísticos do cuDNN
     """
     random.seed(seed)
     np.random.seed(seed)
@@ -70,54 +96,244 @@ def set_seed(seed: int) -> None:
     if torch.cuda.is_available():
         torch.cuda.manual_seed(seed)
         torch.cuda.manual_seed_all(seed)
-        torch.backends.cudnn.deterministic = True
-        torch.backends.cudnn.benchmark = False
+        torch.backends.cudnn.deterministic = deterministic
+        torch.backends.cudnn.benchmark = not deterministic
+        if not deterministic:
+            torch.set_float32_matmul_precision('high')
+
+
+class PackedImageDataset(Dataset):
+    """
+    Dataset de imagens já decodificadas, lidas via memory-map.
+    
+    Lê os arrays gravados por preprocessing.py --pack. O arquivo é aberto
+    sob demanda em cada processo, para que os workers do DataLoader não
+    recebam uma cópia do array.
+    
+    Atributos:
+        classes: Nomes das classes
+        class_to_idx: Mapeamento de nome da classe para índice
+    """
+    
+    def __init__(self, pack_dir: Path, split: str):
+        """
+        Inicializa o dataset.
+        
+        Args:
+            pack_dir: Diretório do pacote
+            split: 'train' ou 'val'
+        """
+        self.images_path = pack_dir / f"{split}_images.npy"
+        self.labels = np.load(pack_dir / f"{split}_labels.npy")
+        self.images = None
+        
+        with open(pack_dir / "classes.json", 'r') as f:
+            self.classes = json.load(f)
+        self.class_to_idx = {class_name: idx for idx, class_name in enumerate(self.classes)}
+    
+    def __len__(self) -> int:
+        return len(self.labels)
+    
+    def __getitem__(self, idx: int) -> Tuple[torch.Tensor, int]:
+        if self.images is None:
+            self.images = np.load(self.images_path, mmap_mode='r')
+        
+        return torch.from_numpy(np.array(self.images[idx])), int(self.labels[idx])
+    
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['images'] = None
+        return state
+
+
+def read_image_rgb(path: str) -> torch.Tensor:
+    """
+    Carrega uma imagem diretamente como tensor, sem passar pelo PIL.
+    
+    Args:
+        path: Caminho da imagem
+        
+    Returns:
+        Tensor uint8 (3, altura, largura)
+    """
+    return read_image(path, mode=ImageReadMode.RGB)
 
 
-def get_data_transforms() -> Dict[str, transforms.Compose]:
+def collate_encoded(batch: List[Tuple[torch.Tensor, int]]) -> Tuple[List[torch.Tensor], torch.Tensor]:
+    """
+    Agrupa um batch de imagens codificadas (bytes de tamanhos diferentes).
+    
+    Args:
+        batch: Lista de pares (bytes da imagem, rótulo)
+        
+    Returns:
+        Lista de tensores de bytes e tensor de rótulos
+    """
+    images, labels = zip(*batch)
+    return list(images), default_collate(labels)
+
+
+def load_batch(inputs, device: torch.device) -> torch.Tensor:
+    """
+    Transfere um batch para o dispositivo, decodificando-o se necessário.
+    
+    Args:
+        inputs: Tensor uint8 (B, 3, H, W) ou lista de JPEGs codificados
+        device: Dispositivo de destino
+        
+    Returns:
+        Tensor uint8 (B, 3, H, W) no dispositivo
+    """
+    if isinstance(inputs, list):
+        # Decodificação em lote no dispositivo (nvJPEG na GPU)
+        return torch.stack(decode_jpeg(inputs, mode=ImageReadMode.RGB, device=device))
+    return inputs.to(device, non_blocking=True)
+
+
+class CUDAPrefetcher:
+    """
+    Iterador que transfere o próximo batch enquanto o atual é processado.
+    
+    Na GPU, a cópia (ou decodificação) do batch seguinte é feita em um stream
+    CUDA separado, sobrepondo-se ao forward/backward do batch atual. Na CPU,
+    apenas transfere os batches em sequência.
+    """
+    
+    def __init__(self, loader: DataLoader, device: torch.device):
+        """
+        Inicializa o prefetcher.
+        
+        Args:
+            loader: DataLoader de origem (com pin_memory=True)
+            device: Dispositivo de destino
+        """
+        self.loader = loader
+        self.device = device
+        self.stream = torch.cuda.Stream(device) if device.type == 'cuda' else None
+        self.next_batch = None
+    
+    def __len__(self) -> int:
+        return len(self.loader)
+    
+    def __iter__(self) -> "CUDAPrefetcher":
+        self.iterator = iter(self.loader)
+        self._prefetch()
+        return self
+    
+    def _prefetch(self):
+        """Carrega o próximo batch no dispositivo."""
+        try:
+            inputs, labels = next(self.iterator)
+        except StopIteration:
+            self.next_batch = None
+            return
+        
+        if self.stream is None:
+            self.next_batch = (load_batch(inputs, self.device), labels.to(self.device))
+            return
+        
+        with torch.cuda.stream(self.stream):
+            self.next_batch = (
+                load_batch(inputs, self.device),
+                labels.to(self.device, non_blocking=True)
+            )
+    
+    def __next__(self) -> Tuple[torch.Tensor, torch.Tensor]:
+        if self.next_batch is None:
+            raise StopIteration
+        
+        batch = self.next_batch
+        if self.stream is not None:
+            # Aguardar a cópia e liberar a memória só após o uso no stream atual
+            current_stream = torch.cuda.current_stream(self.device)
+            current_stream.wait_stream(self.stream)
+            for tensor in batch:
+                tensor.record_stream(current_stream)
+        
+        self._prefetch()
+        return batch
+
+
+def get_data_transforms(device: torch.device) -> Dict[str, nn.Module]:
     """
     Define transformações para os conjuntos de treino e validação.
     
+    No treino, os workers do DataLoader apenas decodificam e recortam as
+    imagens (uint8); a augmentation é aplicada por batch no dispositivo.
+    A validação é um pipeline TorchScript aplicado por batch aos tensores
+    uint8 carregados com read_image (as imagens processadas têm todas o
+    mesmo tamanho, então podem ser empilhadas antes da transformação).
+    
+    Args:
+        device: Dispositivo onde a augmentation de treino é executada
+        
     Returns:
-        Dicionário com transformações para treino e validação
+        Dicionário com transformações de treino (na CPU e seu equivalente
+        no dispositivo), augmentation de treino e transformações de
+        validação (por batch, no dispositivo)
     """
     # Transformações comuns
-    normalize = transforms.Normalize(
-        mean=[0.485, 0.456, 0.406],
-        std=[0.229, 0.224, 0.225]
-    )
+    normalize = transforms.Normalize(mean=IMAGENET_MEAN, std=IMAGENET_STD)
     
-    # Transformações de treino (com augmentation)
+    # Transformações de treino na CPU (sem augmentation)
     train_transform = transforms.Compose([
-        transforms.RandomResizedCrop(224),
-        transforms.RandomHorizontalFlip(),
-        transforms.RandomRotation(20),
-        transforms.ColorJitter(brightness=0.1, contrast=0.1),
-        transforms.ToTensor(),
-        normalize
+        transforms.Resize(256),
+        transforms.CenterCrop(224),
+        transforms.PILToTensor()
     ])
     
-    # Transformações de validação
-    val_transform = transforms.Compose([
-        transforms.Resize(256),
+    # Mesmo redimensionamento/recorte de train_transform, no dispositivo, para
+    # batches que não passam por ele (pacote e decodificação na GPU)
+    train_resize = torch.jit.script(nn.Sequential(
+        transforms.Resize(256, antialias=True),
+        transforms.CenterCrop(224)
+    ).to(device))
+    
+    # Augmentation de treino, aplicada ao batch já no dispositivo
+    train_augmentation = nn.Sequential(
+        K.RandomResizedCrop((224, 224)),
+        K.RandomHorizontalFlip(),
+        K.RandomRotation(20.0, p=1.0),
+        K.ColorJitter(brightness=0.1, contrast=0.1, p=1.0),
+        K.Normalize(mean=torch.tensor(IMAGENET_MEAN), std=torch.tensor(IMAGENET_STD))
+    ).to(device)
+    
+    # Transformações de validação (determinísticas, compiladas com TorchScript)
+    val_transform = torch.jit.script(nn.Sequential(
+        transforms.Resize(256, antialias=True),
         transforms.CenterCrop(224),
-        transforms.ToTensor(),
+        transforms.ConvertImageDtype(torch.float32),
         normalize
-    ])
+    ).to(device))
     
     return {
         'train': train_transform,
+        'train_resize': train_resize,
+        'train_augmentation': train_augmentation,
         'val': val_transform
     }
 
 
-def load_datasets(data_dir: Path, transforms_dict: Dict[str, transforms.Compose]) -> Tuple[datasets.ImageFolder, datasets.ImageFolder]:
+def load_datasets(
+    data_dir: Path,
+    transforms_dict: Dict[str, nn.Module],
+    gpu_decode: bool = False,
+    packed: bool = False
+) -> Tuple[Dataset, Dataset]:
     """
     Carrega conjuntos de dados de treino e validação.
     
+    Com packed, as imagens vêm decodificadas do pacote em processed/packed
+    (tensores uint8 de 224x224). Com gpu_decode, os datasets retornam os
+    bytes JPEG sem decodificar. Nos dois casos, o Resize/CenterCrop fica a
+    cargo do dispositivo (train_resize no treino e a transformação de
+    validação).
+    
     Args:
         data_dir: Diretório contendo os dados processados
         transforms_dict: Dicionário com transformações para treino e validação
+        gpu_decode: Se True, carrega as imagens ainda codificadas
+        packed: Se True, lê as imagens do pacote memory-mapped
         
     Returns:
         Conjuntos de dados de treino e validação
@@ -125,21 +341,40 @@ def load_datasets(data_dir: Path, transforms_dict: Dict[str, transforms.Compose]
     # Caminhos dos diretórios
     train_dir = data_dir / "processed" / "train"
     val_dir = data_dir / "processed" / "val"
+    pack_dir = data_dir / "processed" / "packed"
+    
+    if packed:
+        if not (pack_dir / "classes.json").exists():
+            raise FileNotFoundError(f"Pacote de dados não encontrado: {pack_dir}")
+        
+        train_dataset = PackedImageDataset(pack_dir, 'train')
+        val_dataset = PackedImageDataset(pack_dir, 'val')
+        
+        print(f"Carregadas {len(train_dataset)} imagens de treino (pacote)")
+        print(f"Carregadas {len(val_dataset)} imagens de validação (pacote)")
+        print(f"Número de classes: {len(train_dataset.classes)}")
+        
+        return train_dataset, val_dataset
     
     # Verificar se diretórios existem
     if not train_dir.exists() or not val_dir.exists():
         raise FileNotFoundError(f"Diretórios de dados não encontrados: {train_dir}, {val_dir}")
     
     # Carregar datasets
-    train_dataset = datasets.ImageFolder(
-        root=str(train_dir),
-        transform=transforms_dict['train']
-    )
-    
-    val_dataset = datasets.ImageFolder(
-        root=str(val_dir),
-        transform=transforms_dict['val']
-    )
+    if gpu_decode:
+        train_dataset = datasets.ImageFolder(root=str(train_dir), loader=read_file)
+        val_dataset = datasets.ImageFolder(root=str(val_dir), loader=read_file)
+    else:
+        train_dataset = datasets.ImageFolder(
+            root=str(train_dir),
+            transform=transforms_dict['train']
+        )
+        
+        # Validação carregada como tensores uint8; a transformação é por batch
+        val_dataset = datasets.ImageFolder(
+            root=str(val_dir),
+            loader=read_image_rgb
+        )
     
     print(f"Carregadas {len(train_dataset)} imagens de treino")
     print(f"Carregadas {len(val_dataset)} imagens de validação")
@@ -148,11 +383,23 @@ def load_datasets(data_dir: Path, transforms_dict: Dict[str, transforms.Compose]
     return train_dataset, val_dataset
 
 
+def worker_init_fn(worker_id: int) -> None:
+    """
+    Inicializa um worker do DataLoader com uma única thread do PyTorch,
+    evitando disputa de CPU entre os workers.
+    
+    Args:
+        worker_id: Índice do worker
+    """
+    torch.set_num_threads(1)
+
+
 def create_dataloaders(
-    train_dataset: datasets.ImageFolder,
-    val_dataset: datasets.ImageFolder,
+    train_dataset: Dataset,
+    val_dataset: Dataset,
     batch_size: int,
-    num_workers: int
+    num_workers: int,
+    gpu_decode: bool = False
 ) -> Tuple[DataLoader, DataLoader]:
     """
     Cria DataLoaders para treino e validação.
@@ -162,24 +409,37 @@ def create_dataloaders(
         val_dataset: Conjunto de dados de validação
         batch_size: Tamanho do batch
         num_workers: Número de workers
+        gpu_decode: Se True, os batches são listas de JPEGs codificados
         
     Returns:
         DataLoaders para treino e validação
     """
+    # Workers mantidos entre épocas, com mais batches em andamento
+    loader_kwargs = {
+        'num_workers': num_workers,
+        'pin_memory': True,
+        'collate_fn': collate_encoded if gpu_decode else None
+    }
+    if num_workers > 0:
+        loader_kwargs.update(
+            persistent_workers=True,
+            prefetch_factor=4,
+            worker_init_fn=worker_init_fn
+        )
+    
     train_loader = DataLoader(
         train_dataset,
         batch_size=batch_size,
         shuffle=True,
-        num_workers=num_workers,
-        pin_memory=True
+        **loader_kwargs
     )
     
     val_loader = DataLoader(
         val_dataset,
         batch_size=batch_size,
         shuffle=False,
-        num_workers=num_workers,
-        pin_memory=True
+        drop_last=False,
+        **loader_kwargs
     )
     
     return train_loader, val_loader
@@ -190,7 +450,12 @@ def train_one_epoch(
     train_loader: DataLoader,
     criterion: nn.Module,
     optimizer: optim.Optimizer,
-    device: torch.device
+    device: torch.device,
+    augmentation: nn.Module,
+    scaler: torch.cuda.amp.GradScaler,
+    amp_dtype: Optional[torch.dtype] = None,
+    memory_format: torch.memory_format = torch.contiguous_format,
+    resize: Optional[nn.Module] = None
 ) -> float:
     """
     Treina o modelo por uma época.
@@ -201,35 +466,49 @@ def train_one_epoch(
         criterion: Função de perda
         optimizer: Otimizador
         device: Dispositivo (CPU/GPU)
+        augmentation: Augmentation aplicada ao batch no dispositivo
+        scaler: GradScaler (desativado em FP32 e BF16)
+        amp_dtype: Tipo do autocast (None para treinar em FP32)
+        memory_format: Layout de memória das entradas (channels_last na GPU)
+        resize: Redimensionamento/recorte no dispositivo, para batches que
+            não passaram pela transformação de treino na CPU
         
     Returns:
         Perda média para a época
     """
     model.train()
-    running_loss = 0.0
+    
+    # Estatísticas acumuladas no dispositivo (sincronização só no fim da época)
+    running_loss = torch.zeros((), device=device)
     
     # Loop de treinamento
-    for inputs, labels in tqdm(train_loader, desc="Treinando", leave=False):
-        # Mover dados para o dispositivo
-        inputs = inputs.to(device)
-        labels = labels.to(device)
+    # Os batches chegam já no dispositivo (cópia sobreposta ao processamento)
+    for inputs, labels in tqdm(CUDAPrefetcher(train_loader, device), desc="Treinando", leave=False):
+        if resize is not None:
+            inputs = resize(inputs)
+        
+        # Converter para float e aplicar augmentation no dispositivo
+        inputs = augmentation(inputs.float() / 255.0)
+        inputs = inputs.contiguous(memory_format=memory_format)
         
-        # Zerar gradientes
-        optimizer.zero_grad()
+        # Zerar gradientes (liberando os tensores em vez de preenchê-los com zeros)
+        optimizer.zero_grad(set_to_none=True)
         
-        # Forward pass
-        outputs = model(inputs)
-        loss = criterion(outputs, labels)
+        # Forward pass (precisão mista, se habilitada)
+        with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+            outputs = model(inputs)
+            loss = criterion(outputs, labels)
         
         # Backward pass e otimização
-        loss.backward()
-        optimizer.step()
+        scaler.scale(loss).backward()
+        scaler.step(optimizer)
+        scaler.update()
         
         # Acumular estatísticas
-        running_loss += loss.item() * inputs.size(0)
+        running_loss += loss.detach().float() * inputs.size(0)
     
     # Calcular perda média
-    epoch_loss = running_loss / len(train_loader.dataset)
+    epoch_loss = running_loss.item() / len(train_loader.dataset)
     
     return epoch_loss
 
@@ -238,7 +517,10 @@ def evaluate(
     model: nn.Module,
     val_loader: DataLoader,
     criterion: nn.Module,
-    device: torch.device
+    device: torch.device,
+    transform: nn.Module,
+    amp_dtype: Optional[torch.dtype] = None,
+    memory_format: torch.memory_format = torch.contiguous_format
 ) -> Tuple[float, float]:
     """
     Avalia o modelo no conjunto de validação.
@@ -248,37 +530,42 @@ def evaluate(
         val_loader: DataLoader para dados de validação
         criterion: Função de perda
         device: Dispositivo (CPU/GPU)
+        transform: Transformação de validação aplicada ao batch no dispositivo
+        amp_dtype: Tipo do autocast (None para avaliar em FP32)
+        memory_format: Layout de memória das entradas (channels_last na GPU)
         
     Returns:
         Perda e acurácia médias
     """
     model.eval()
-    running_loss = 0.0
-    correct = 0
+    
+    # Estatísticas acumuladas no dispositivo (sincronização só no fim)
+    running_loss = torch.zeros((), device=device)
+    correct = torch.zeros((), dtype=torch.long, device=device)
     total = 0
     
     # Desativar cálculo de gradientes
     with torch.no_grad():
-        for inputs, labels in tqdm(val_loader, desc="Avaliando", leave=False):
-            # Mover dados para o dispositivo
-            inputs = inputs.to(device)
-            labels = labels.to(device)
+        for inputs, labels in tqdm(CUDAPrefetcher(val_loader, device), desc="Avaliando", leave=False):
+            # Aplicar a transformação no dispositivo
+            inputs = transform(inputs).contiguous(memory_format=memory_format)
             
             # Forward pass
-            outputs = model(inputs)
-            loss = criterion(outputs, labels)
+            with torch.autocast(device_type=device.type, dtype=amp_dtype, enabled=amp_dtype is not None):
+                outputs = model(inputs)
+                loss = criterion(outputs, labels)
             
             # Acumular estatísticas
-            running_loss += loss.item() * inputs.size(0)
+            running_loss += loss.float() * inputs.size(0)
             
             # Calcular acurácia
             _, predicted = outputs.max(1)
             total += labels.size(0)
-            correct += predicted.eq(labels).sum().item()
+            correct += predicted.eq(labels).sum()
     
     # Calcular métricas médias
-    val_loss = running_loss / len(val_loader.dataset)
-    val_acc = correct / total
+    val_loss = running_loss.item() / len(val_loader.dataset)
+    val_acc = correct.item() / total
     
     return val_loss, val_acc
 
@@ -288,7 +575,7 @@ def main():
     args = parse_args()
     
     # Definir seeds para reprodutibilidade
-    set_seed(args.seed)
+    set_seed(args.seed, deterministic=args.deterministic)
     
     # Configurar dispositivo
     device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -300,17 +587,23 @@ def main():
     model_dir.mkdir(parents=True, exist_ok=True)
     
     # Obter transformações
-    transforms_dict = get_data_transforms()
+    transforms_dict = get_data_transforms(device)
     
     # Carregar datasets
-    train_dataset, val_dataset = load_datasets(data_dir, transforms_dict)
+    train_dataset, val_dataset = load_datasets(
+        data_dir,
+        transforms_dict,
+        gpu_decode=args.gpu_decode and not args.packed,
+        packed=args.packed
+    )
     
     # Criar dataloaders
     train_loader, val_loader = create_dataloaders(
         train_dataset=train_dataset,
         val_dataset=val_dataset,
         batch_size=args.batch_size,
-        num_workers=args.num_workers
+        num_workers=args.num_workers,
+        gpu_decode=args.gpu_decode and not args.packed
     )
     
     # Inicializar modelo
@@ -318,6 +611,24 @@ def main():
     model = SpeciesClassifier(num_classes=num_classes, pretrained=True)
     model.to(device)
     
+    # Layout NHWC (channels_last) na GPU, mais eficiente para as convoluções
+    memory_format = torch.channels_last if device.type == 'cuda' else torch.contiguous_format
+    model.to(memory_format=memory_format)
+    
+    # Modelo compilado usado no treino e na avaliação; o original (mesmos
+    # parâmetros) é o que é salvo
+    run_model = model
+    if args.compile:
+        print("Compilando modelo com torch.compile...")
+        run_model = torch.compile(model, mode='reduce-overhead')
+    
+    # Precisão mista na GPU: BF16 quando suportado (sem escala de gradientes),
+    # senão FP16 com GradScaler
+    amp_dtype = None
+    if device.type == 'cuda' and not args.no_amp:
+        amp_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+    scaler = torch.cuda.amp.GradScaler(enabled=amp_dtype == torch.float16)
+    
     # Configurar critério (função de perda) e otimizador
     criterion = nn.CrossEntropyLoss()
     optimizer = optim.Adam(
@@ -358,19 +669,27 @@ def main():
         
         # Treinar uma época
         train_loss = train_one_epoch(
-            model=model,
+            model=run_model,
             train_loader=train_loader,
             criterion=criterion,
             optimizer=optimizer,
-            device=device
+            device=device,
+            augmentation=transforms_dict['train_augmentation'],
+            scaler=scaler,
+            amp_dtype=amp_dtype,
+            memory_format=memory_format,
+            resize=transforms_dict['train_resize'] if args.packed or args.gpu_decode else None
         )
         
         # Avaliar no conjunto de validação
         val_loss, val_acc = evaluate(
-            model=model,
+            model=run_model,
             val_loader=val_loader,
             criterion=criterion,
-            device=device
+            device=device,
+            transform=transforms_dict['val'],
+            amp_dtype=amp_dtype,
+            memory_format=memory_format
         )
         
         # Atualizar learning rate
@@ -16,10 +16,13 @@ from typing import Dict, List, Tuple, Optional, Any, Union
 from PIL import Image
 import io
 import base64
+import threading
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import torch
 import torchvision.transforms as transforms
+from torchvision.io import decode_jpeg, ImageReadMode
+from torchvision.transforms.v2 import functional as F
 
 
 def load_image_from_file(image_path: str) -> Image.Image:
@@ -108,38 +111,77 @@ def preprocess_image(
     return img_tensor
 
 
+def decode_image_to_tensor(
+    image_bytes: bytes,
+    device: torch.device,
+    image_size: int = 224,
+    resize_size: int = 256
+) -> torch.Tensor:
+    """
+    Decodifica um JPEG e pré-processa a imagem diretamente no dispositivo.
+    
+    Na GPU a decodificação usa o nvJPEG. O resultado equivale ao de
+    preprocess_image(load_image_from_bytes(image_bytes)).
+    
+    Args:
+        image_bytes: Bytes da imagem JPEG
+        device: Dispositivo para decodificação e pré-processamento
+        image_size: Tamanho do recorte central
+        resize_size: Tamanho do menor lado após o redimensionamento
+        
+    Returns:
+        Tensor (1, 3, image_size, image_size) no dispositivo
+        
+    Raises:
+        RuntimeError: Se os bytes não forem um JPEG válido
+    """
+    data = torch.frombuffer(bytearray(image_bytes), dtype=torch.uint8)
+    image = decode_jpeg(data, mode=ImageReadMode.RGB, device=device)
+    
+    # Mesmas transformações de preprocess_image, em tensores
+    image = F.resize(image, [resize_size], antialias=True)
+    image = F.center_crop(image, [image_size, image_size])
+    
+    return image.float().div_(255.0).unsqueeze(0)
+
+
 def get_top_k_predictions(
     logits: torch.Tensor, 
-    class_to_idx: Dict[str, int], 
+    idx_to_class: np.ndarray, 
     k: int = 5
-) -> List[Tuple[str, float]]:
+) -> List[List[Tuple[str, float]]]:
     """
-    Obter as top-k previsões a partir dos logits do modelo.
+    Obter as top-k previsões a partir dos logits de um batch.
+    
+    Softmax e top-k são calculados no dispositivo dos logits, com uma única
+    transferência para a CPU por batch.
     
     Args:
-        logits: Saída do modelo (logits)
-        class_to_idx: Mapeamento de classes para índices
+        logits: Saída do modelo (logits), de forma (B, num_classes)
+        idx_to_class: Array de nomes de classes (ver model.build_idx_to_class)
         k: Número de top previsões a retornar
         
     Returns:
-        Lista de tuplas (classe, probabilidade) ordenadas por probabilidade
+        Para cada imagem do batch, lista de tuplas (classe, probabilidade)
+        ordenadas por probabilidade
     """
-    # Aplicar softmax para obter probabilidades
-    probs = torch.nn.functional.softmax(logits, dim=1)[0]
-    
-    # Obter as top-k predições
-    top_k_probs, top_k_indices = torch.topk(probs, k)
+    with torch.no_grad():
+        # Aplicar softmax (em FP32) e obter as top-k predições
+        probs = torch.nn.functional.softmax(logits.float(), dim=1)
+        top_k_probs, top_k_indices = torch.topk(probs, min(k, probs.shape[1]), dim=1)
     
-    # Converter tensores para listas
-    top_k_probs = top_k_probs.cpu().detach().numpy().tolist()
-    top_k_indices = top_k_indices.cpu().detach().numpy().tolist()
+    # Uma única transferência para a CPU
+    top_k_probs = top_k_probs.cpu().numpy()
+    top_k_indices = top_k_indices.cpu().numpy()
     
-    # Mapear índices para nomes de classes
-    idx_to_class = {idx: cls for cls, idx in class_to_idx.items()}
-    top_k_classes = [idx_to_class[idx] for idx in top_k_indices]
+    # Mapear índices para nomes de classes (indexação vetorizada)
+    top_k_classes = idx_to_class[top_k_indices]
     
-    # Retornar lista de tuplas (classe, probabilidade)
-    return list(zip(top_k_classes, top_k_probs))
+    # Retornar listas de tuplas (classe, probabilidade)
+    return [
+        list(zip(classes, probs))
+        for classes, probs in zip(top_k_classes.tolist(), top_k_probs.tolist())
+    ]
 
 
 def format_prediction_result(
@@ -171,11 +213,88 @@ def format_prediction_result(
     return results
 
 
+class Visualizer:
+    """
+    Renderiza visualizações de previsões reutilizando uma única figura.
+    
+    A figura é criada uma vez, sem pyplot (renderização Agg, sem backend
+    gráfico), e a cada chamada apenas os eixos são limpos e redesenhados.
+    
+    Atributos:
+        fig: Figura matplotlib reutilizada
+        ax1: Eixo da imagem de entrada
+        ax2: Eixo do barplot de previsões
+    """
+    
+    def __init__(self, figsize: Tuple[int, int] = (12, 6)):
+        """
+        Inicializa a figura e os eixos.
+        
+        Args:
+            figsize: Tamanho da figura em polegadas
+        """
+        self.fig = Figure(figsize=figsize)
+        self.ax1, self.ax2 = self.fig.subplots(1, 2)
+        self.lock = threading.Lock()
+    
+    def render(
+        self,
+        image: Image.Image,
+        predictions: List[Tuple[str, float]],
+        save_path: Optional[str] = None
+    ) -> Optional[Figure]:
+        """
+        Desenha a imagem e suas previsões na figura.
+        
+        Args:
+            image: Imagem original
+            predictions: Lista de tuplas (classe, probabilidade)
+            save_path: Se fornecido, salva a visualização neste caminho
+            
+        Returns:
+            A figura (reutilizada na próxima chamada) se save_path for None,
+            caso contrário None
+        """
+        with self.lock:
+            self.ax1.clear()
+            self.ax2.clear()
+            
+            # Mostrar imagem
+            self.ax1.imshow(np.asarray(image))
+            self.ax1.set_title("Imagem de entrada")
+            self.ax1.axis('off')
+            
+            # Criar barplot de previsões
+            classes = [cls.replace('_', ' ') for cls, _ in predictions]
+            probabilities = [prob for _, prob in predictions]
+            
+            y_pos = np.arange(len(classes))
+            
+            self.ax2.barh(y_pos, probabilities, align='center')
+            self.ax2.set_yticks(y_pos)
+            self.ax2.set_yticklabels(classes)
+            self.ax2.invert_yaxis()  # Ordenar de cima para baixo
+            self.ax2.set_xlabel('Probabilidade')
+            self.ax2.set_title('Top Predições')
+            
+            self.fig.tight_layout()
+            
+            if save_path:
+                self.fig.savefig(save_path)
+                return None
+        
+        return self.fig
+
+
+# Visualizador compartilhado por create_visualization
+_visualizer = None
+
+
 def create_visualization(
     image: Image.Image,
     predictions: List[Tuple[str, float]],
     save_path: Optional[str] = None
-) -> Optional[plt.Figure]:
+) -> Optional[Figure]:
     """
     Cria uma visualização da imagem com suas previsões.
     
@@ -185,34 +304,11 @@ def create_visualization(
         save_path: Se fornecido, salva a visualização neste caminho
         
     Returns:
-        Figura matplotlib se save_path for None, caso contrário None
+        Figura matplotlib se save_path for None, caso contrário None.
+        A figura é compartilhada e redesenhada na próxima chamada.
     """
-    # Criar figura
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(12, 6))
-    
-    # Mostrar imagem
-    ax1.imshow(np.array(image))
-    ax1.set_title("Imagem de entrada")
-    ax1.axis('off')
-    
-    # Criar barplot de previsões
-    classes = [cls.replace('_', ' ') for cls, _ in predictions]
-    probabilities = [prob for _, prob in predictions]
-    
-    y_pos = np.arange(len(classes))
-    
-    ax2.barh(y_pos, probabilities, align='center')
-    ax2.set_yticks(y_pos)
-    ax2.set_yticklabels(classes)
-    ax2.invert_yaxis()  # Ordenar de cima para baixo
-    ax2.set_xlabel('Probabilidade')
-    ax2.set_title('Top Predições')
-    
-    plt.tight_layout()
-    
-    if save_path:
-        plt.savefig(save_path)
-        plt.close(fig)
-        return None
+    global _visualizer
+    if _visualizer is None:
+        _visualizer = Visualizer()
     
-    return fig
\ No newline at end of file
+    return _visualizer.render(image, predictions, save_path)